@@ -3,18 +3,31 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
 from .bridge import iPanoBridge
+from .const import CONF_FLEET_MODE
+from .fleet import iPanoFleet
 from .services import async_setup_services
+from .websocket import async_setup_websocket
 
 DOMAIN = "ipano_plus"
-PLATFORMS = ["sensor", "binary_sensor", "switch"]
+PLATFORMS = ["sensor", "binary_sensor", "switch", "event"]
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up iPano Plus from a config entry."""
     hass.data.setdefault(DOMAIN, {})
 
-    # Create and store bridge (pass hass and the entry.data dict)
-    bridge = iPanoBridge(hass, entry.data)
+    # Options override the data entered in the config flow
+    config = {**entry.data, **entry.options}
+
+    # Panels in fleet mode share one timer wheel for heartbeat and reconnect
+    fleet = None
+    if config.get(CONF_FLEET_MODE):
+        fleet = hass.data[DOMAIN].get("_fleet")
+        if fleet is None:
+            fleet = hass.data[DOMAIN]["_fleet"] = iPanoFleet(hass)
+
+    # Create and store bridge (pass hass and the merged config dict)
+    bridge = iPanoBridge(hass, config, fleet=fleet, entry_id=entry.entry_id)
     hass.data[DOMAIN][entry.entry_id] = bridge
 
     # Start the bridge connection
@@ -23,14 +36,27 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Set up platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    # Set up services (only once per integration)
+    # Set up services and websocket commands (only once per integration)
     if "_services_setup" not in hass.data[DOMAIN]:
         await async_setup_services(hass)
+        async_setup_websocket(hass)
         hass.data[DOMAIN]["_services_setup"] = True
 
+    # Reload the entry when options change
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry after its options were changed."""
+    bridge = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if bridge is not None and bridge.config == {**entry.data, **entry.options}:
+        # Only a value the running bridge already uses was saved (the detected model)
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
@@ -41,4 +67,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         # Use the public async_stop method defined on the bridge
         await bridge.async_stop()
 
+        # Drop the shared fleet once its last panel is gone
+        fleet = hass.data[DOMAIN].get("_fleet")
+        if fleet is not None and not fleet.bridges:
+            hass.data[DOMAIN].pop("_fleet")
+
     return unload_ok
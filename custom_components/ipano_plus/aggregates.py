@@ -0,0 +1,96 @@
+"""Rolling occupancy and button press aggregates kept by the bridge."""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import homeassistant.util.dt as dt_util
+
+HOUR = timedelta(hours=1)
+
+
+class iPanoActivity:
+    """Occupancy time and press counts for the current hour and day.
+
+    Every proximity or button frame costs a constant amount of work: the
+    ongoing occupancy is accrued up to the frame time and the counters are
+    reset when an hour or day boundary has passed. Hours are UTC hours, like
+    Home Assistant's long-term statistics; days follow the local time zone.
+    The owner should publish the closing values (after ``accrue`` up to
+    ``hour_end``) before calling ``advance`` past a boundary.
+    """
+
+    def __init__(self, num_buttons: int):
+        """Initialize empty aggregates for the current hour."""
+        now = dt_util.utcnow()
+        self.hour_start = now.replace(minute=0, second=0, microsecond=0)
+        self.day_start = dt_util.start_of_local_day(dt_util.as_local(now))
+        self.occupancy_hour = 0.0
+        self.occupancy_day = 0.0
+        self.presses_hour = {num: 0 for num in range(1, num_buttons + 1)}
+        self.presses_day = dict(self.presses_hour)
+        self.last_activity: Optional[datetime] = None
+        self._occupied_since: Optional[datetime] = None
+
+    @property
+    def hour_end(self) -> datetime:
+        """Return the end of the current hour bucket."""
+        return self.hour_start + HOUR
+
+    def accrue(self, until: datetime) -> None:
+        """Add the ongoing occupancy up to a time, at most to the end of the current hour."""
+        until = min(until, self.hour_end)
+        if self._occupied_since is None or until <= self._occupied_since:
+            return
+        seconds = (until - self._occupied_since).total_seconds()
+        self.occupancy_hour += seconds
+        self.occupancy_day += seconds
+        self._occupied_since = until
+
+    def advance(self, now: datetime) -> None:
+        """Accrue occupancy up to now and roll the hour and day buckets."""
+        while now >= self.hour_end:
+            boundary = self.hour_end
+            if self._occupied_since is None:
+                # Nothing to carry over, jump straight to the current hour
+                boundary = now.replace(minute=0, second=0, microsecond=0)
+            self.accrue(boundary)
+
+            self.hour_start = boundary
+            self.occupancy_hour = 0.0
+            self.presses_hour = dict.fromkeys(self.presses_hour, 0)
+            day_start = dt_util.start_of_local_day(dt_util.as_local(boundary))
+            if day_start != self.day_start:
+                self.day_start = day_start
+                self.occupancy_day = 0.0
+                self.presses_day = dict.fromkeys(self.presses_day, 0)
+        self.accrue(now)
+
+    def proximity(self, detected: bool, now: datetime) -> None:
+        """Record a proximity frame."""
+        self.advance(now)
+        if detected:
+            self.last_activity = now
+            if self._occupied_since is None:
+                self._occupied_since = now
+        else:
+            self._occupied_since = None
+
+    def press(self, button: int, now: datetime) -> None:
+        """Record a button press (not its release or auto-repeats)."""
+        self.advance(now)
+        self.last_activity = now
+        if button in self.presses_hour:
+            self.presses_hour[button] += 1
+            self.presses_day[button] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the aggregates as a serializable dict."""
+        return {
+            "hour_start": self.hour_start.isoformat(),
+            "day_start": self.day_start.isoformat(),
+            "occupied": self._occupied_since is not None,
+            "occupancy_hour_s": round(self.occupancy_hour, 1),
+            "occupancy_day_s": round(self.occupancy_day, 1),
+            "presses_hour": self.presses_hour,
+            "presses_day": self.presses_day,
+            "last_activity": self.last_activity.isoformat() if self.last_activity else None,
+        }
@@ -6,7 +6,7 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN, SIGNAL_BUTTON_EVENT, SIGNAL_PROXIMITY_UPDATE
+from .const import DOMAIN, BUTTON_MAP, SIGNAL_BUTTON_EVENT, SIGNAL_PROXIMITY_UPDATE
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,13 +15,15 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, asyn
     """Set up iPano Plus binary sensors from config entry."""
     _LOGGER.debug("Setting up iPano binary sensors")
 
+    bridge = hass.data.get(DOMAIN, {}).get(config_entry.entry_id)
+    button_names = bridge.button_map.values() if bridge else BUTTON_MAP.values()
+
+    # One binary sensor per button of this panel model
     sensors = [
-        iPanoButtonSensor(config_entry, "Button 1", "button_1"),
-        iPanoButtonSensor(config_entry, "Button 2", "button_2"),
-        iPanoButtonSensor(config_entry, "Button 3", "button_3"),
-        iPanoButtonSensor(config_entry, "Button 4", "button_4"),
-        iPanoProximitySensor(config_entry),
+        iPanoButtonSensor(config_entry, button_id.replace("_", " ").capitalize(), button_id)
+        for button_id in button_names
     ]
+    sensors.append(iPanoProximitySensor(config_entry))
 
     async_add_entities(sensors)
 
@@ -31,6 +33,9 @@ class iPanoButtonSensor(BinarySensorEntity):
 
     _attr_device_class = BinarySensorDeviceClass.RUNNING
     _attr_should_poll = False
+    # Superseded by the button event entities; kept for existing automations
+    _attr_entity_registry_enabled_default = False
+    _unrecorded_attributes = frozenset({"repeat_count"})
 
     def __init__(self, config_entry, name, button_id):
         self._config_entry = config_entry
@@ -44,7 +49,7 @@ class iPanoButtonSensor(BinarySensorEntity):
     async def async_added_to_hass(self) -> None:
         """Register dispatcher callback for button events."""
         self._dispatcher_unsub = async_dispatcher_connect(
-            self.hass, SIGNAL_BUTTON_EVENT, self._handle_button_event
+            self.hass, f"{SIGNAL_BUTTON_EVENT}_{self._config_entry.entry_id}", self._handle_button_event
         )
 
     @callback
@@ -53,14 +58,11 @@ class iPanoButtonSensor(BinarySensorEntity):
         try:
             if event.get("button") == self._button_id:
                 is_pressed = event.get("action") == "pressed"
-                repeat_count = event.get("repeat_count", 0)
+                self._repeat_count = event.get("repeat_count", 0)
+                # Auto-repeats of a held button do not change the state
+                if self._attr_is_on == is_pressed:
+                    return
                 self._attr_is_on = is_pressed
-                self._repeat_count = repeat_count
-                self._attr_extra_state_attributes = {
-                    "repeat_count": repeat_count,
-                    "button_id": self._button_id,
-                    "last_event": event.get("timestamp"),
-                }
                 self.async_write_ha_state()
                 _LOGGER.debug(f"Button {self._button_id} updated: {'pressed' if is_pressed else 'released'}")
         except Exception as e:
@@ -68,11 +70,12 @@ class iPanoButtonSensor(BinarySensorEntity):
 
     @property
     def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
         return {
             "identifiers": {("ipano", self._config_entry.entry_id)},
             "name": self._config_entry.data.get("name", "iPano Plus"),
             "manufacturer": "iPano",
-            "model": "Plus 6-inch",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
         }
 
     @property
@@ -103,7 +106,7 @@ class iPanoProximitySensor(BinarySensorEntity):
     async def async_added_to_hass(self) -> None:
         """Register dispatcher for proximity updates."""
         self._dispatcher_unsub = async_dispatcher_connect(
-            self.hass, SIGNAL_PROXIMITY_UPDATE, self._handle_proximity_event
+            self.hass, f"{SIGNAL_PROXIMITY_UPDATE}_{self._config_entry.entry_id}", self._handle_proximity_event
         )
 
         # initialize from bridge if available
@@ -112,18 +115,25 @@ class iPanoProximitySensor(BinarySensorEntity):
             self._attr_is_on = bridge.proximity_state
 
     @callback
-    def _handle_proximity_event(self, detected):
+    def _handle_proximity_event(self, detected, received=None):
+        # The panel repeats proximity frames; only write transitions
+        if self._attr_is_on == bool(detected):
+            return
         self._attr_is_on = bool(detected)
         self.async_write_ha_state()
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if bridge:
+            bridge.record_latency("proximity", received)
         _LOGGER.debug(f"Proximity updated: {self._attr_is_on}")
 
     @property
     def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
         return {
             "identifiers": {("ipano", self._config_entry.entry_id)},
             "name": self._config_entry.data.get("name", "iPano Plus"),
             "manufacturer": "iPano",
-            "model": "Plus 6-inch",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
         }
 
     async def async_will_remove_from_hass(self):
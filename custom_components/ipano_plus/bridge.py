@@ -2,13 +2,18 @@
 import asyncio
 import json
 import logging
+import random
 import socket
 from datetime import datetime
-from typing import Dict, Any, Optional
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Any, List, Optional, Tuple
 import time
 
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_utc_time_change
+import homeassistant.util.dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -18,9 +23,35 @@ from .const import (
     MSG_TYPE_PROXIMITY,
     MSG_TYPE_HEARTBEAT,
     MSG_TYPE_BACKLIGHT_CONTROL,
+    MSG_TYPE_BACKLIGHT_QUERY,
     MSG_TYPE_RELAY_CONTROL,
+    MSG_TYPE_RELAY_QUERY,
     MSG_TYPE_SCREEN_WAKE,
-    BUTTON_MAP,
+    MSG_TYPE_FOREGROUND_QUERY,
+    MSG_TYPE_START_APPLICATION,
+    MSG_TYPE_PROXIMITY_SET,
+    MSG_TYPE_PROXIMITY_QUERY,
+    REPLY_TYPES,
+    REQUEST_TIMEOUT,
+    OFFLINE_COMMAND_TTL,
+    OFFLINE_BUFFER_SIZE,
+    CONF_RESYNC_INTERVAL,
+    DEFAULT_RESYNC_INTERVAL,
+    RESYNC_JITTER,
+    CONF_LOCAL_RULES,
+    CONF_PROXY_PORT,
+    CONF_PROXY_BIND,
+    DEFAULT_PROXY_BIND,
+    HEARTBEAT_INTERVAL,
+    RECONNECT_DELAY,
+    RECONNECT_MAX_DELAY,
+    FLEET_LIVENESS_TIMEOUT,
+    FLEET_MAX_BACKOFF,
+    CONF_MODEL,
+    LATENCY_KINDS,
+    DEFAULT_MODEL,
+    MODEL_AUTO,
+    PANEL_MODELS,
     BACKLIGHT_COLORS,
     EVENT_BUTTON_PRESSED,
     EVENT_PROXIMITY_DETECTED,
@@ -29,7 +60,16 @@ from .const import (
     SIGNAL_RELAY_UPDATE,
     SIGNAL_BUTTON_EVENT,
     SIGNAL_PROXIMITY_UPDATE,
+    SIGNAL_RESYNC,
+    SIGNAL_RULE_EXECUTED,
+    SIGNAL_ACTIVITY_UPDATE,
 )
+from .aggregates import iPanoActivity
+from .frames import HEARTBEAT, build_frame_table, encode_messages
+from .histogram import LatencyHistogram
+from .protocol import iPanoProtocol
+from .proxy import iPanoProxy
+from .rules import COLOR_VALUES, parse_rules
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -37,31 +77,143 @@ _LOGGER = logging.getLogger(__name__)
 class iPanoBridge:
     """Bridge to communicate with iPano Plus device."""
 
-    def __init__(self, hass: HomeAssistant, config: Dict[str, Any]):
-        """Initialize the bridge."""
+    def __init__(self, hass: HomeAssistant, config: Dict[str, Any], fleet=None, entry_id: Optional[str] = None):
+        """Initialize the bridge.
+
+        When a fleet is given, heartbeat, liveness and reconnect checks are
+        driven by its shared timer instead of per-bridge tasks.
+        """
         self.hass = hass
         self.config = config
+        self.fleet = fleet
+        self.entry_id = entry_id
         self.host = config.get("host", config.get("ip") or None)
         self.port = config.get("port", 3124)
         self.name = config.get("name", "iPano Plus")
 
-        # Connection
-        self.reader: Optional[asyncio.StreamReader] = None
-        self.writer: Optional[asyncio.StreamWriter] = None
+        # Connection (frames arrive through iPanoProtocol callbacks)
+        self.transport: Optional[asyncio.Transport] = None
+        self.protocol: Optional[iPanoProtocol] = None
         self.connected = False
         self.reconnect_task: Optional[asyncio.Task] = None
-        self.listen_task: Optional[asyncio.Task] = None
         self.heartbeat_task: Optional[asyncio.Task] = None
         self.last_heartbeat = 0.0
-
-        # State tracking
-        self.button_states = {131: False, 132: False, 133: False, 134: False}
-        self.relay_states = {0: False, 1: False}
-        self.backlight_states = {0: 0, 1: 0, 2: 0, 3: 0}
+        self.last_rx = 0.0
+
+        # Requests awaiting a reply, oldest first, keyed by reply message type
+        self._pending: Dict[int, Deque[asyncio.Future]] = {}
+
+        # Scene applications waiting for relay/backlight echoes (targets are 0-based)
+        self._state_waiters: List[Tuple[Dict[int, bool], Dict[int, int], asyncio.Future]] = []
+
+        # Background reconciliation against the panel
+        self.resync_interval = config.get(CONF_RESYNC_INTERVAL, DEFAULT_RESYNC_INTERVAL)
+        self.resync_task: Optional[asyncio.Task] = None
+        self._activity_unsub: Optional[Callable[[], None]] = None
+        self.resync_count = 0
+        self.drift_events = 0
+        self.last_resync: Optional[float] = None
+        self._next_resync = 0.0
+
+        # Local button rules, run straight from the button frame (parsed in _apply_model)
+        self.local_rules = {}
+        self.rule_executions = 0
+        self.rule_latency_last = 0.0
+        self.rule_latency_max = 0.0
+
+        # Relay/backlight commands issued while disconnected, keyed by (type, channel)
+        self._offline: "OrderedDict[Tuple[int, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.offline_buffered = 0
+        self.offline_flushed = 0
+        self.offline_dropped = 0
+
+        # Inbound fairness counters, maintained by the protocol
+        self.frames_shed = 0
+        self.inbound_yields = 0
+        self.inbound_hold_max = 0.0
+
+        # Frame received -> entity state written, per channel kind; recorded by the entities
+        self.latency = {kind: LatencyHistogram() for kind in LATENCY_KINDS}
+
+        # Optional local fan-out proxy for logging and test tooling
+        self.proxy: Optional[iPanoProxy] = None
+        if config.get(CONF_PROXY_PORT):
+            self.proxy = iPanoProxy(self, config.get(CONF_PROXY_BIND, DEFAULT_PROXY_BIND), config[CONF_PROXY_PORT])
+
+        # Fleet mode (heartbeat and reconnect timers owned by the fleet)
+        self._next_reconnect = 0.0
+        self._reconnect_attempt = 0
+
+        # State tracking, sized by the panel model
+        self.model_key = config.get(CONF_MODEL, MODEL_AUTO)
+        self._apply_model(DEFAULT_MODEL if self.model_key == MODEL_AUTO else self.model_key)
         self.proximity_state = False
+        self.proximity_config: Optional[Any] = None
+        self.foreground_app: Optional[Any] = None
 
         _LOGGER.info(f"iPano Bridge initialized for {self.host}:{self.port}")
 
+    def _apply_model(self, model_key: str) -> None:
+        """Size state storage and lookup tables for a panel variant."""
+        if model_key not in PANEL_MODELS:
+            _LOGGER.warning(f"Unknown panel model {model_key}, using {DEFAULT_MODEL}")
+            model_key = DEFAULT_MODEL
+        self.model = PANEL_MODELS[model_key]
+        self.num_buttons = self.model["buttons"]
+        self.num_relays = self.model["relays"]
+
+        # keycode -> button name, e.g. 131 -> "button_1"
+        self.button_map = {keycode: f"button_{num}" for num, keycode in enumerate(self.model["keycodes"], start=1)}
+        self.button_states = {keycode: False for keycode in self.button_map}
+        self.relay_states = {num: False for num in range(self.num_relays)}
+        self.backlight_states = {num: 0 for num in range(self.num_buttons)}
+        self.activity = iPanoActivity(self.num_buttons)
+        self.frames = build_frame_table(self.num_buttons, self.num_relays)
+
+        try:
+            self.local_rules = parse_rules(self.config.get(CONF_LOCAL_RULES, ""), self.num_buttons, self.num_relays)
+        except ValueError as err:
+            # Rules may target channels of a model that is not detected yet
+            if self.model_key == MODEL_AUTO:
+                _LOGGER.debug(f"Local rules do not fit the default model yet: {err}")
+            else:
+                _LOGGER.error(f"Ignoring invalid local rules: {err}")
+            self.local_rules = {}
+
+    async def _async_detect_model(self) -> None:
+        """Pick the smallest panel variant with as many relays as the panel reports."""
+        reply = await self.async_request(MSG_TYPE_RELAY_QUERY)
+        relays = self._reply_data(reply)
+        if not isinstance(relays, list):
+            _LOGGER.warning(f"Could not detect model of {self.name}, using {self.model['name']}")
+            return
+
+        reported = max((relay.get("num", 0) + 1 for relay in relays), default=0)
+        by_relays = sorted(PANEL_MODELS, key=lambda key: PANEL_MODELS[key]["relays"])
+        model_key = next((key for key in by_relays if PANEL_MODELS[key]["relays"] >= reported), by_relays[-1])
+        # Detect once per session; the persisted model skips detection from then on
+        self.model_key = model_key
+        _LOGGER.info(f"Detected {PANEL_MODELS[model_key]['name']} ({reported} relays) at {self.host}")
+
+        entry = self.hass.config_entries.async_get_entry(self.entry_id) if self.entry_id else None
+        if entry is None or entry.state is ConfigEntryState.SETUP_IN_PROGRESS:
+            # No entities exist yet, so the state can still be sized in place
+            self._apply_model(model_key)
+            if entry is not None:
+                self.hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_MODEL: model_key})
+        elif PANEL_MODELS[model_key] is not self.model:
+            # Entities were created for the default model (the panel was offline during
+            # setup); never resize under them. Saving the model reloads the entry.
+            _LOGGER.info(f"Reloading {self.name} to set up the entities of the {PANEL_MODELS[model_key]['name']}")
+            self.hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_MODEL: model_key})
+            return
+        else:
+            # The entities already match; save the model so later starts skip detection.
+            # The update listener sees the unchanged config and does not reload.
+            self.config = {**self.config, CONF_MODEL: model_key}
+            self.hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_MODEL: model_key})
+        self._handle_relay_change(reply)
+
     async def test_connection(self, timeout: float = 3.0) -> bool:
         """Quick test to see if the device accepts TCP connections."""
         try:
@@ -81,42 +233,65 @@ class iPanoBridge:
     async def async_start(self):
         """Start the bridge connection."""
         _LOGGER.info(f"Starting iPano Plus bridge for {self.host}:{self.port}")
-        await self._connect_with_retry()
-
-    async def _connect_with_retry(self, max_retries: int = 5):
-        """Connect with retry logic."""
-        for attempt in range(max_retries):
+        # Close the activity buckets on the hour, also when the panel is quiet
+        self._activity_unsub = async_track_utc_time_change(self.hass, self._roll_activity, minute=0, second=0)
+        if self.proxy is not None:
             try:
-                await self._connect()
-                if self.connected:
-                    return
-            except Exception as e:
-                _LOGGER.error(f"Connection attempt {attempt + 1} failed: {e}")
-
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                _LOGGER.info(f"Retrying in {wait_time} seconds...")
-                await asyncio.sleep(wait_time)
-
-        _LOGGER.error("Failed to connect after multiple attempts")
+                await self.proxy.async_start()
+            except OSError as err:
+                _LOGGER.error(f"Cannot start iPano proxy on {self.proxy.host}:{self.proxy.port}: {err}")
+                self.proxy = None
+        if self.fleet is not None:
+            # The fleet retries on its own schedule if this first attempt fails
+            self.fleet.async_register(self)
+            await self._connect()
+            return
+        await self._connect()
+        if not self.connected and (not self.reconnect_task or self.reconnect_task.done()):
+            # Keep trying in the background, sharing the one reconnect task
+            # with _handle_connection_lost so there is never a second link
+            self.reconnect_task = asyncio.create_task(self._reconnect())
 
     async def _connect(self):
         """Establish TCP connection to iPano."""
+        if self.transport is not None and not self.transport.is_closing():
+            _LOGGER.debug(f"Already connected to {self.host}:{self.port}")
+            return
         try:
             _LOGGER.debug(f"Connecting to {self.host}:{self.port}")
-            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            transport, protocol = await asyncio.get_running_loop().create_connection(
+                lambda: iPanoProtocol(self), self.host, self.port
+            )
+            if self.transport is not None and not self.transport.is_closing():
+                # Another attempt won the race while this one was connecting
+                transport.close()
+                return
+            self.transport, self.protocol = transport, protocol
             self.connected = True
-            self.last_heartbeat = time.time()
+            self.last_heartbeat = self.last_rx = time.time()
+            self._reconnect_attempt = 0
+            # The initial state query below doubles as the first resync
+            self._schedule_resync(self.last_rx)
 
             _LOGGER.info(f"Connected to iPano Plus at {self.host}:{self.port}")
 
-            # Start listening & heartbeat
-            self.listen_task = asyncio.create_task(self._listen_loop())
-            self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            # Start heartbeat (the fleet drives it for its bridges)
+            if self.fleet is None:
+                if self.heartbeat_task:
+                    self.heartbeat_task.cancel()
+                self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
 
             # small delay then query initial states
             await asyncio.sleep(1)
+            if self.protocol is not protocol:
+                # The link dropped meanwhile; the next attempt takes over
+                return
+            if self.model_key == MODEL_AUTO:
+                await self._async_detect_model()
             await self._query_initial_states()
+            if self.protocol is not protocol:
+                return
+            self._flush_offline()
 
             # Fire connection event (bus + dispatcher)
             payload = {
@@ -126,7 +301,7 @@ class iPanoBridge:
                 "timestamp": datetime.now().isoformat(),
             }
             self.hass.bus.async_fire(EVENT_BUTTON_PRESSED, payload)
-            async_dispatcher_send(self.hass, SIGNAL_BUTTON_EVENT, payload)
+            async_dispatcher_send(self.hass, f"{SIGNAL_BUTTON_EVENT}_{self.entry_id}", payload)
 
         except (ConnectionRefusedError, socket.gaierror) as err:
             _LOGGER.error(f"Connection refused: {err}")
@@ -146,78 +321,86 @@ class iPanoBridge:
         while self.connected:
             try:
                 current_time = time.time()
-                if current_time - self.last_heartbeat > 15:
-                    success = await self._send_message(
-                        {"type": MSG_TYPE_HEARTBEAT, "data": "ok", "state": 200, "msg": ""}
-                    )
+                if current_time - self.last_rx > FLEET_LIVENESS_TIMEOUT:
+                    # A half-open link never reports connection_lost on its own
+                    _LOGGER.warning(f"No data from {self.name} for {FLEET_LIVENESS_TIMEOUT}s, closing link")
+                    self.transport.close()
+                    return
+                if current_time - self.last_heartbeat > HEARTBEAT_INTERVAL:
+                    success = await self._send_message(HEARTBEAT)
                     if success:
                         self.last_heartbeat = current_time
                         _LOGGER.debug("Heartbeat sent")
+                self._async_maybe_resync(current_time)
             except Exception as e:
                 _LOGGER.debug(f"Heartbeat error: {e}")
 
             await asyncio.sleep(5)
 
-    async def _listen_loop(self):
-        """Listen for newline-delimited JSON messages."""
-        buffer = ""
-        while self.connected:
-            try:
-                data = await asyncio.wait_for(self.reader.read(4096), timeout=30)
-                if not data:
-                    _LOGGER.warning("Connection closed by iPano (no data)")
-                    self.connected = False
-                    break
-
-                buffer += data.decode("utf-8", errors="ignore")
-
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    line = line.strip()
-                    if line:
-                        await self._process_message(line)
-
-            except asyncio.TimeoutError:
-                _LOGGER.debug("Read timeout, continue listening")
-                continue
-            except asyncio.CancelledError:
-                _LOGGER.debug("Listen loop cancelled")
-                break
-            except (ConnectionResetError, ConnectionAbortedError) as e:
-                _LOGGER.warning(f"Connection reset: {e}")
-                self.connected = False
+    async def _reconnect(self):
+        """Reconnect with exponential back-off until the link is up again."""
+        delay = RECONNECT_DELAY
+        while not self.connected:
+            await asyncio.sleep(delay)
+            if self.connected:
                 break
-            except Exception as err:
-                _LOGGER.error(f"Error in listen loop: {err}")
-                self.connected = False
-                break
-
-        # Try to reconnect
+            _LOGGER.info(f"Attempting to reconnect to {self.name}...")
+            await self._connect()
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    @callback
+    def _handle_connection_lost(self, protocol: iPanoProtocol, exc: Optional[Exception]) -> None:
+        """Handle the link going down and schedule a reconnect."""
+        if self.protocol is not protocol:
+            return
+        self.transport = None
+        self.protocol = None
+        self._fail_pending(exc or ConnectionResetError("Connection lost"))
         if not self.connected:
-            await self._handle_disconnection()
+            return
+        self.connected = False
+        _LOGGER.warning(f"Disconnected from iPano {self.name}: {exc or 'closed by panel'}, scheduling reconnect...")
 
-    async def _handle_disconnection(self):
-        """Handle disconnection and reconnect attempts."""
-        _LOGGER.warning("Disconnected from iPano, scheduling reconnect...")
+        if self.fleet is not None:
+            self._next_reconnect = time.time() + RECONNECT_DELAY
+            return
 
         if self.heartbeat_task:
             self.heartbeat_task.cancel()
-
-        if self.writer:
-            try:
-                self.writer.close()
-                await asyncio.sleep(0.1)
-            except Exception:
-                pass
-
-        # Reconnect after short delay
-        await asyncio.sleep(5)
-        if not self.connected:
-            _LOGGER.info("Attempting to reconnect...")
-            await self._connect_with_retry(max_retries=3)
-
-    async def _process_message(self, message: str):
-        """Process incoming JSON message from the panel."""
+        if not self.reconnect_task or self.reconnect_task.done():
+            self.reconnect_task = asyncio.create_task(self._reconnect())
+
+    @callback
+    def _async_fleet_check(self, now: float) -> None:
+        """Run one heartbeat, liveness or reconnect check for the fleet."""
+        if self.connected:
+            if now - self.last_rx > FLEET_LIVENESS_TIMEOUT:
+                _LOGGER.warning(f"No data from {self.name} for {FLEET_LIVENESS_TIMEOUT}s, closing link")
+                self.transport.close()
+            elif now - self.last_heartbeat > HEARTBEAT_INTERVAL:
+                if self._write_message(HEARTBEAT):
+                    self.last_heartbeat = now
+                    _LOGGER.debug("Heartbeat sent")
+            self._async_maybe_resync(now)
+            return
+
+        if now < self._next_reconnect or (self.reconnect_task and not self.reconnect_task.done()):
+            return
+
+        self._reconnect_attempt += 1
+        self._next_reconnect = now + min(2 ** self._reconnect_attempt, FLEET_MAX_BACKOFF)
+        _LOGGER.info(f"Attempting to reconnect to {self.name} (attempt {self._reconnect_attempt})")
+        self.reconnect_task = asyncio.create_task(self._connect())
+
+    @callback
+    def _process_message(self, message: str, received: Optional[float] = None):
+        """Process incoming JSON message from the panel.
+
+        received is the time.monotonic() at which the frame was read; it is
+        passed on to the handlers and entities for latency tracing.
+        """
+        if received is None:
+            received = time.monotonic()
         try:
             _LOGGER.debug(f"Raw message received: {message}")
             data = json.loads(message)
@@ -226,41 +409,67 @@ class iPanoBridge:
 
             if state != 200:
                 _LOGGER.warning(f"Message with non-200 state: {data}")
+                self._resolve_pending(msg_type, data)
                 return
 
             _LOGGER.debug(f"Processing message type {msg_type}: {data}")
 
             if msg_type == MSG_TYPE_BUTTON:
-                await self._handle_button_event(data)
+                self._handle_button_event(data, received)
             elif msg_type == MSG_TYPE_RELAY_CHANGE:
-                await self._handle_relay_change(data)
+                self._handle_relay_change(data, received)
             elif msg_type == MSG_TYPE_BACKLIGHT_CHANGE:
-                await self._handle_backlight_change(data)
+                self._handle_backlight_change(data, received)
             elif msg_type == MSG_TYPE_PROXIMITY:
-                await self._handle_proximity(data)
+                self._handle_proximity(data, received)
             elif msg_type == MSG_TYPE_HEARTBEAT:
                 _LOGGER.debug("Heartbeat acknowledged")
                 self.last_heartbeat = time.time()
-            else:
+            elif msg_type == MSG_TYPE_FOREGROUND_QUERY:
+                self.foreground_app = data.get("data")
+            elif msg_type == MSG_TYPE_PROXIMITY_QUERY:
+                self.proximity_config = data.get("data")
+            elif msg_type not in self._pending:
                 _LOGGER.debug(f"Unhandled message type {msg_type}")
 
+            self._resolve_pending(msg_type, data)
+
         except json.JSONDecodeError as err:
             _LOGGER.error(f"Invalid JSON from iPano: {message}, error: {err}")
         except Exception as err:
             _LOGGER.error(f"Error processing message: {err}")
 
-    async def _handle_button_event(self, data: Dict[str, Any]):
+    @callback
+    def _handle_button_event(self, data: Dict[str, Any], received: Optional[float] = None):
         """Handle button press/release event and notify Home Assistant."""
         try:
+            started = time.perf_counter()
             event_data = data.get("data", {})
             key_code = event_data.get("keyCode")
             action = event_data.get("action")  # 0=press, 1=release
             repeat_count = event_data.get("repeatCount", 0)
 
-            if key_code in BUTTON_MAP:
-                button_name = BUTTON_MAP[key_code]
+            if key_code in self.button_map:
+                button_name = self.button_map[key_code]
                 is_pressed = (action == 0)
                 self.button_states[key_code] = is_pressed
+                if is_pressed and not repeat_count:
+                    now = dt_util.utcnow()
+                    self._roll_activity(now)
+                    # Not pushed: the activity sensors pick presses up when polled
+                    self.activity.press(int(button_name.rsplit("_", 1)[1]), now)
+
+                # Local rules first, so relays react before HA sees the event
+                if self.local_rules:
+                    if not is_pressed:
+                        gesture = "released"
+                    elif not repeat_count:
+                        gesture = "pressed"
+                    else:
+                        # Only the first auto-repeat counts as "held"
+                        gesture = "held" if repeat_count == 1 else None
+                    if gesture:
+                        self._run_local_rules(int(button_name.rsplit("_", 1)[1]), gesture, started)
 
                 payload = {
                     "device": self.name,
@@ -269,11 +478,12 @@ class iPanoBridge:
                     "repeat_count": repeat_count,
                     "key_code": key_code,
                     "timestamp": datetime.now().isoformat(),
+                    "received": received,
                 }
 
                 # Fire bus event and dispatcher signal
                 self.hass.bus.async_fire(EVENT_BUTTON_PRESSED, payload)
-                async_dispatcher_send(self.hass, SIGNAL_BUTTON_EVENT, payload)
+                async_dispatcher_send(self.hass, f"{SIGNAL_BUTTON_EVENT}_{self.entry_id}", payload)
 
                 _LOGGER.info(f"Button {button_name} {'pressed' if is_pressed else 'released'}")
             else:
@@ -282,7 +492,35 @@ class iPanoBridge:
         except Exception as e:
             _LOGGER.error(f"Error handling button event: {e}")
 
-    async def _handle_relay_change(self, data: Dict[str, Any]):
+    @callback
+    def _run_local_rules(self, button: int, gesture: str, started: float) -> None:
+        """Execute the local rules bound to a button gesture."""
+        actions = self.local_rules.get((button, gesture))
+        if not actions:
+            return
+
+        for channel, number, action in actions:
+            if channel == "relay":
+                state = not self.relay_states.get(number - 1, False) if action == "toggle" else action == "on"
+                self._write_message(self._frame(MSG_TYPE_RELAY_CONTROL, number - 1, state))
+            else:
+                self._write_message(self._frame(MSG_TYPE_BACKLIGHT_CONTROL, number - 1, COLOR_VALUES[action]))
+
+        latency = (time.perf_counter() - started) * 1000
+        self.rule_executions += 1
+        self.rule_latency_last = latency
+        self.rule_latency_max = max(self.rule_latency_max, latency)
+        _LOGGER.debug(f"Local rules for button {button} {gesture} ran in {latency:.3f} ms")
+        async_dispatcher_send(self.hass, f"{SIGNAL_RULE_EXECUTED}_{self.entry_id}", latency)
+
+    @callback
+    def record_latency(self, kind: str, received: Optional[float]) -> None:
+        """Record the time from reading a frame to an entity writing its state."""
+        if received is not None:
+            self.latency[kind].add((time.monotonic() - received) * 1000)
+
+    @callback
+    def _handle_relay_change(self, data: Dict[str, Any], received: Optional[float] = None):
         """Handle relay status change."""
         try:
             relay_data_list = data.get("data", [])
@@ -296,6 +534,8 @@ class iPanoBridge:
                 state = relay_data.get("val", False)
 
                 if relay_num in self.relay_states:
+                    if self.relay_states[relay_num] == state:
+                        continue
                     self.relay_states[relay_num] = state
 
                     payload = {
@@ -303,20 +543,24 @@ class iPanoBridge:
                         "relay": relay_num + 1,
                         "state": "on" if state else "off",
                         "timestamp": datetime.now().isoformat(),
+                        "received": received,
                     }
 
                     # Fire bus event and dispatcher
                     self.hass.bus.async_fire(EVENT_RELAY_CHANGED, payload)
-                    async_dispatcher_send(self.hass, SIGNAL_RELAY_UPDATE, self.relay_states)
+                    async_dispatcher_send(self.hass, f"{SIGNAL_RELAY_UPDATE}_{self.entry_id}", self.relay_states, received)
 
                     _LOGGER.info(f"Relay {relay_num + 1}: {'ON' if state else 'OFF'}")
                 else:
                     _LOGGER.debug(f"Ignoring relay {relay_num} (unsupported index)")
 
+            self._check_state_waiters()
+
         except Exception as e:
             _LOGGER.error(f"Error handling relay change: {e}")
 
-    async def _handle_backlight_change(self, data: Dict[str, Any]):
+    @callback
+    def _handle_backlight_change(self, data: Dict[str, Any], received: Optional[float] = None):
         """Handle backlight status change and notify listeners."""
         try:
             backlight_data_list = data.get("data", [])
@@ -325,14 +569,16 @@ class iPanoBridge:
                 _LOGGER.error(f"Invalid backlight data format: {backlight_data_list}")
                 return
 
+            changed = False
             for light_data in backlight_data_list:
                 button_num = light_data.get("num")
                 value = light_data.get("val", 0)
 
-                if 0 <= button_num <= 3:
+                if button_num in self.backlight_states:
                     old_value = self.backlight_states.get(button_num, 0)
                     self.backlight_states[button_num] = value
                     if old_value != value:
+                        changed = True
                         _LOGGER.info(
                             f"Button {button_num + 1} backlight changed: {BACKLIGHT_COLORS.get(value, 'unknown')}"
                         )
@@ -340,26 +586,35 @@ class iPanoBridge:
                     _LOGGER.warning(f"Invalid button number in backlight data: {button_num}")
 
             # Notify listeners about backlight state change
-            async_dispatcher_send(self.hass, SIGNAL_BACKLIGHT_UPDATE, self.backlight_states)
+            if changed:
+                async_dispatcher_send(self.hass, f"{SIGNAL_BACKLIGHT_UPDATE}_{self.entry_id}", self.backlight_states, received)
+                self._check_state_waiters()
 
         except Exception as e:
             _LOGGER.error(f"Error handling backlight change: {e}")
 
-    async def _handle_proximity(self, data: Dict[str, Any]):
+    @callback
+    def _handle_proximity(self, data: Dict[str, Any], received: Optional[float] = None):
         """Handle proximity sensor event."""
         try:
-            detected = data.get("data", False)
-            self.proximity_state = bool(detected)
+            detected = bool(data.get("data", False))
+            if detected != self.proximity_state:
+                # Repeated frames would only move last_activity; the sensors poll the rest
+                now = dt_util.utcnow()
+                self._roll_activity(now)
+                self.activity.proximity(detected, now)
+            self.proximity_state = detected
 
             payload = {
                 "device": self.name,
                 "detected": self.proximity_state,
                 "timestamp": datetime.now().isoformat(),
+                "received": received,
             }
 
             # Fire bus event and dispatcher
             self.hass.bus.async_fire(EVENT_PROXIMITY_DETECTED, payload)
-            async_dispatcher_send(self.hass, SIGNAL_PROXIMITY_UPDATE, self.proximity_state)
+            async_dispatcher_send(self.hass, f"{SIGNAL_PROXIMITY_UPDATE}_{self.entry_id}", self.proximity_state, received)
 
             _LOGGER.info(f"Proximity sensor: {'detected' if self.proximity_state else 'clear'}")
 
@@ -367,35 +622,270 @@ class iPanoBridge:
             _LOGGER.error(f"Error handling proximity event: {e}")
 
     async def _query_initial_states(self):
-        """Query initial device states (relays and backlights)."""
+        """Query initial device states, pipelined in a single round trip."""
         try:
-            await self._send_message({"type": MSG_TYPE_RELAY_QUERY})
-            await asyncio.sleep(0.2)
-            await self._send_message({"type": MSG_TYPE_BACKLIGHT_CHANGE if False else 12})
-            _LOGGER.debug("Initial state queries sent")
+            relays, backlights, proximity = await asyncio.gather(
+                self.async_query_relays(),
+                self.async_query_backlights(),
+                self.async_query_proximity(),
+            )
+            _LOGGER.debug(f"Initial states: relays={relays}, backlights={backlights}, proximity={proximity}")
         except Exception as err:
             _LOGGER.error(f"Error querying initial states: {err}")
 
-    async def _send_message(self, data: Dict[str, Any]) -> bool:
-        """Send JSON message to iPano, terminated with newline."""
-        if not self.connected or not self.writer:
+    @callback
+    def _dispatch_activity(self) -> None:
+        async_dispatcher_send(self.hass, f"{SIGNAL_ACTIVITY_UPDATE}_{self.entry_id}")
+
+    @callback
+    def _roll_activity(self, now: datetime) -> None:
+        """Publish the closing values of finished activity buckets, then start new ones.
+
+        The activity sensors are total sensors with last_reset, so the value
+        at the end of each bucket has to be written before the reset.
+        """
+        if now < self.activity.hour_end:
+            return
+        self.activity.accrue(self.activity.hour_end)
+        self._dispatch_activity()
+        self.activity.advance(now)
+        self._dispatch_activity()
+
+    def _schedule_resync(self, now: float) -> None:
+        """Pick the next jittered reconciliation time."""
+        jitter = random.uniform(1 - RESYNC_JITTER, 1 + RESYNC_JITTER)
+        self._next_resync = now + self.resync_interval * jitter
+
+    @callback
+    def _async_maybe_resync(self, now: float) -> None:
+        """Start a reconciliation if one is due; called from the heartbeat timers."""
+        if not self.resync_interval or not self.connected or now < self._next_resync:
+            return
+        if self.resync_task and not self.resync_task.done():
+            return
+        self._schedule_resync(now)
+        self.resync_task = asyncio.create_task(self.async_resync())
+
+    async def async_resync(self) -> int:
+        """Re-query relays and backlights and count channels that drifted.
+
+        Replies go through the normal handlers, which only dispatch channels
+        whose value changed. Returns the number of drifted channels.
+        """
+        relays_before = dict(self.relay_states)
+        backlights_before = dict(self.backlight_states)
+
+        relays, backlights = await asyncio.gather(self.async_query_relays(), self.async_query_backlights())
+
+        drifted = []
+        if relays is not None:
+            drifted += [f"relay_{num + 1}" for num, val in relays.items() if relays_before.get(num) != val]
+        if backlights is not None:
+            drifted += [
+                f"backlight_{num + 1}" for num, val in backlights.items() if backlights_before.get(num) != val
+            ]
+
+        self.resync_count += 1
+        self.drift_events += len(drifted)
+        self.last_resync = time.time()
+        if drifted:
+            _LOGGER.warning(f"State drift on {self.name}, corrected: {', '.join(drifted)}")
+        else:
+            _LOGGER.debug(f"Resync of {self.name}: no drift")
+
+        async_dispatcher_send(self.hass, f"{SIGNAL_RESYNC}_{self.entry_id}", drifted)
+        return len(drifted)
+
+    @callback
+    def _resolve_pending(self, msg_type: int, data: Dict[str, Any]) -> None:
+        """Complete the oldest request waiting for this reply type."""
+        waiters = self._pending.get(msg_type)
+        while waiters:
+            future = waiters.popleft()
+            if not future.done():
+                future.set_result(data)
+                break
+        if not waiters:
+            self._pending.pop(msg_type, None)
+
+    @callback
+    def _fail_pending(self, exc: Exception) -> None:
+        """Fail every outstanding request, e.g. when the link drops."""
+        pending, self._pending = self._pending, {}
+        for waiters in pending.values():
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(exc)
+
+    async def async_request(
+        self, msg_type: int, data: Any = None, timeout: float = REQUEST_TIMEOUT
+    ) -> Optional[Dict[str, Any]]:
+        """Send a request and wait for the matching reply frame.
+
+        Returns the reply message, or None if the request could not be sent,
+        timed out or the link dropped. Several requests can be in flight at
+        once; replies of the same type are matched oldest first.
+        """
+        reply_type = REPLY_TYPES[msg_type]
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(reply_type, deque()).append(future)
+
+        if data is None:
+            message = self._frame(msg_type)
+        else:
+            message = {"type": msg_type, "data": data}
+        try:
+            if not await self._send_message(message):
+                return None
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"No reply to request type {msg_type} within {timeout}s")
+            return None
+        except Exception as err:
+            _LOGGER.debug(f"Request type {msg_type} failed: {err}")
+            return None
+        finally:
+            waiters = self._pending.get(reply_type)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    self._pending.pop(reply_type, None)
+
+    @staticmethod
+    def _reply_data(reply: Optional[Dict[str, Any]]) -> Optional[Any]:
+        if reply is None or reply.get("state", 200) != 200:
+            return None
+        return reply.get("data")
+
+    async def async_query_relays(self) -> Optional[Dict[int, bool]]:
+        """Query relay states; returns {relay index: on} once the panel replies."""
+        if self._reply_data(await self.async_request(MSG_TYPE_RELAY_QUERY)) is None:
+            return None
+        return dict(self.relay_states)
+
+    async def async_query_backlights(self) -> Optional[Dict[int, int]]:
+        """Query backlight states; returns {button index: color value}."""
+        if self._reply_data(await self.async_request(MSG_TYPE_BACKLIGHT_QUERY)) is None:
+            return None
+        return dict(self.backlight_states)
+
+    async def async_query_proximity(self) -> Optional[Any]:
+        """Query the proximity sensor configuration."""
+        return self._reply_data(await self.async_request(MSG_TYPE_PROXIMITY_QUERY))
+
+    async def async_query_foreground(self) -> Optional[Any]:
+        """Query the application currently in the foreground."""
+        return self._reply_data(await self.async_request(MSG_TYPE_FOREGROUND_QUERY))
+
+    def _frame(self, msg_type: int, num: Optional[int] = None, val: Any = None) -> Dict[str, Any]:
+        """Return the pre-encoded frame for a command, or a plain message if there is none."""
+        frame = self.frames.get((msg_type, num, val))
+        if frame is not None:
+            return frame
+        if num is None:
+            return {"type": msg_type}
+        return {"type": msg_type, "data": {"num": num, "val": val}}
+
+    def _write_message(self, data: Dict[str, Any]) -> bool:
+        """Write a JSON message on the transport without awaiting."""
+        return self._write_messages([data])
+
+    def _write_messages(self, messages: List[Dict[str, Any]]) -> bool:
+        """Write several JSON messages in a single transport write."""
+        if not self.connected or not self.transport:
             _LOGGER.warning("Cannot send message - not connected to iPano")
             return False
 
         try:
-            message = json.dumps(data) + "\n"
-            self.writer.write(message.encode())
-            await self.writer.drain()
-            _LOGGER.debug(f"Sent: {data}")
+            self.transport.write(encode_messages(messages))
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(f"Sent: {messages if len(messages) > 1 else messages[0]}")
+            return True
+        except Exception as e:
+            _LOGGER.error(f"Error sending message: {e}")
+            return False
+
+    def _buffer_offline(self, data: Dict[str, Any]) -> bool:
+        """Keep a relay/backlight command until the link is back; True if buffered."""
+        if data.get("type") not in (MSG_TYPE_RELAY_CONTROL, MSG_TYPE_BACKLIGHT_CONTROL):
+            return False
+
+        key = (data["type"], data["data"]["num"])
+        # Coalesce: a newer command for the same channel replaces the older one
+        self._offline.pop(key, None)
+        self._offline[key] = (time.monotonic() + OFFLINE_COMMAND_TTL, data)
+        self.offline_buffered += 1
+        while len(self._offline) > OFFLINE_BUFFER_SIZE:
+            _, (_, dropped) = self._offline.popitem(last=False)
+            self.offline_dropped += 1
+            _LOGGER.warning(f"Offline buffer of {self.name} full, dropping {dropped}")
+        _LOGGER.info(f"{self.name} is disconnected, queued {data} for reconnect")
+        return True
+
+    @callback
+    def _flush_offline(self) -> None:
+        """Write buffered commands in one batch once the state has been re-read.
+
+        Commands stay buffered until the write succeeds, so a link that drops
+        again during the reconnect keeps them for the next attempt.
+        """
+        if not self._offline or not self.connected:
+            return
+
+        now = time.monotonic()
+        send, expired, satisfied = [], [], []
+        for key, (expires, data) in self._offline.items():
+            msg_type, num = key
+            if expires < now:
+                expired.append(key)
+                continue
+            # Skip commands the panel already satisfies after the resync
+            current = self.relay_states if msg_type == MSG_TYPE_RELAY_CONTROL else self.backlight_states
+            if current.get(num) != data["data"]["val"]:
+                send.append(key)
+            else:
+                satisfied.append(key)
+
+        if expired:
+            stale = [self._offline.pop(key)[1] for key in expired]
+            self.offline_dropped += len(stale)
+            _LOGGER.warning(f"Dropped {len(stale)} stale command(s) for {self.name} after reconnect: {stale}")
+        for key in satisfied:
+            del self._offline[key]
+        if send and self._write_messages([self._offline[key][1] for key in send]):
+            for key in send:
+                del self._offline[key]
+            self.offline_flushed += len(send)
+            _LOGGER.info(f"Flushed {len(send)} queued command(s) to {self.name}")
+
+    async def _send_message(self, data: Dict[str, Any]) -> bool:
+        """Send JSON message to iPano, terminated with newline.
+
+        Only waits when the transport has paused writing because its buffer
+        is above the high-water mark. Relay and backlight commands issued
+        while disconnected are buffered and count as sent; one written
+        directly replaces any buffered command for the same channel.
+        """
+        if not self.connected and self._buffer_offline(data):
+            return True
+        if self._offline and data.get("type") in (MSG_TYPE_RELAY_CONTROL, MSG_TYPE_BACKLIGHT_CONTROL):
+            # This command supersedes one still waiting for the flush
+            self._offline.pop((data["type"], data["data"]["num"]), None)
+
+        protocol = self.protocol
+        if not self._write_message(data):
+            return False
+
+        try:
+            await protocol.drain()
             return True
         except Exception as e:
             _LOGGER.error(f"Error sending message: {e}")
-            self.connected = False
             return False
 
     # Public API methods used by services and entities
     async def async_wake_screen(self) -> bool:
-        success = await self._send_message({"type": MSG_TYPE_SCREEN_WAKE})
+        success = await self._send_message(self._frame(MSG_TYPE_SCREEN_WAKE))
         if success:
             _LOGGER.info("Screen wake command sent")
         return success
@@ -409,10 +899,8 @@ class iPanoBridge:
 
         try:
             btn_num = int(button) - 1
-            if 0 <= btn_num <= 3:
-                return await self._send_message(
-                    {"type": MSG_TYPE_BACKLIGHT_CONTROL, "data": {"num": btn_num, "val": value}}
-                )
+            if btn_num in self.backlight_states:
+                return await self._send_message(self._frame(MSG_TYPE_BACKLIGHT_CONTROL, btn_num, value))
         except Exception:
             _LOGGER.error("Invalid button argument for set_backlight")
 
@@ -422,10 +910,8 @@ class iPanoBridge:
         color_map = {"off": 0, "white": 1, "yellow": 2, "both": 3}
         value = color_map.get(color.lower(), 0)
         success = True
-        for btn_num in range(4):
-            ok = await self._send_message(
-                {"type": MSG_TYPE_BACKLIGHT_CONTROL, "data": {"num": btn_num, "val": value}}
-            )
+        for btn_num in range(self.num_buttons):
+            ok = await self._send_message(self._frame(MSG_TYPE_BACKLIGHT_CONTROL, btn_num, value))
             success = success and ok
             await asyncio.sleep(0.05)
         return success
@@ -434,9 +920,7 @@ class iPanoBridge:
         try:
             relay_num = int(relay) - 1
             if relay_num in self.relay_states:
-                success = await self._send_message(
-                    {"type": MSG_TYPE_RELAY_CONTROL, "data": {"num": relay_num, "val": bool(state)}}
-                )
+                success = await self._send_message(self._frame(MSG_TYPE_RELAY_CONTROL, relay_num, bool(state)))
                 if success:
                     _LOGGER.info(f"Relay {relay} set to {'ON' if state else 'OFF'}")
                 return success
@@ -447,27 +931,130 @@ class iPanoBridge:
             _LOGGER.error(f"Error controlling relay: {e}")
             return False
 
+    async def async_set_proximity(self, enabled: bool, distance: Optional[int] = None) -> bool:
+        """Configure the proximity sensor and wait for the panel to confirm."""
+        config: Dict[str, Any] = {"enable": bool(enabled)}
+        if distance is not None:
+            config["distance"] = int(distance)
+        reply = await self.async_request(MSG_TYPE_PROXIMITY_SET, config)
+        success = reply is not None and reply.get("state", 200) == 200
+        if success:
+            self.proximity_config = config
+            _LOGGER.info(f"Proximity configured: {config}")
+        return success
+
+    async def async_start_application(self, package: str) -> bool:
+        """Launch an application on the panel and wait for the panel to confirm."""
+        reply = await self.async_request(MSG_TYPE_START_APPLICATION, {"packageName": package})
+        success = reply is not None and reply.get("state", 200) == 200
+        if success:
+            _LOGGER.info(f"Started application {package}")
+        return success
+
+    @callback
+    def _check_state_waiters(self) -> None:
+        """Resolve scene applications whose targets the panel has confirmed."""
+        if not self._state_waiters:
+            return
+        remaining = []
+        for relays, backlights, future in self._state_waiters:
+            if future.done():
+                continue
+            if all(self.relay_states.get(num) == val for num, val in relays.items()) and all(
+                self.backlight_states.get(num) == val for num, val in backlights.items()
+            ):
+                future.set_result(True)
+            else:
+                remaining.append((relays, backlights, future))
+        self._state_waiters = remaining
+
+    async def async_apply_scene(
+        self, relays: Dict[int, bool], backlights: Dict[int, str], timeout: float = REQUEST_TIMEOUT
+    ) -> Dict[str, Any]:
+        """Bring relays and backlights to the desired state with one batched write.
+
+        relays and backlights are keyed by 1-based channel number; backlight
+        values are color names. Only channels that differ from the cached state
+        are sent. Returns once the panel has echoed every change, or after
+        timeout.
+        """
+        color_map = {"off": 0, "white": 1, "yellow": 2, "both": 3}
+        target_relays: Dict[int, bool] = {}
+        target_backlights: Dict[int, int] = {}
+        messages = []
+
+        for relay, state in relays.items():
+            num = int(relay) - 1
+            if num not in self.relay_states:
+                _LOGGER.warning(f"Scene skips unsupported relay {relay} on {self.name}")
+                continue
+            if self.relay_states[num] != bool(state):
+                target_relays[num] = bool(state)
+                messages.append(self._frame(MSG_TYPE_RELAY_CONTROL, num, bool(state)))
+
+        for button, color in backlights.items():
+            num = int(button) - 1
+            if num not in self.backlight_states:
+                _LOGGER.warning(f"Scene skips unsupported backlight {button} on {self.name}")
+                continue
+            value = color_map.get(str(color).lower(), 0)
+            if self.backlight_states[num] != value:
+                target_backlights[num] = value
+                messages.append(self._frame(MSG_TYPE_BACKLIGHT_CONTROL, num, value))
+
+        if not messages:
+            return {"sent": 0, "confirmed": True}
+
+        protocol = self.protocol
+        if not self._write_messages(messages):
+            return {"sent": 0, "confirmed": False}
+
+        future = asyncio.get_running_loop().create_future()
+        self._state_waiters.append((target_relays, target_backlights, future))
+        try:
+            await protocol.drain()
+            confirmed = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"Scene on {self.name} not confirmed within {timeout}s")
+            confirmed = False
+        except Exception as err:
+            _LOGGER.error(f"Error applying scene on {self.name}: {err}")
+            confirmed = False
+        finally:
+            if not future.done():
+                future.cancel()
+            # Drop our waiter now rather than on the next state frame, which may never come
+            self._state_waiters = [waiter for waiter in self._state_waiters if waiter[2] is not future]
+
+        _LOGGER.info(f"Scene applied on {self.name}: {len(messages)} channel(s) changed, confirmed={confirmed}")
+        return {"sent": len(messages), "confirmed": confirmed}
+
     async def async_stop(self):
         """Stop the bridge connection and cancel tasks."""
         _LOGGER.info("Stopping iPano Plus bridge")
         self.connected = False
 
-        if self.listen_task:
-            self.listen_task.cancel()
+        if self.fleet is not None:
+            self.fleet.async_unregister(self)
+        if self.proxy is not None:
+            await self.proxy.async_stop()
+
         if self.heartbeat_task:
             self.heartbeat_task.cancel()
         if self.reconnect_task:
             self.reconnect_task.cancel()
-
-        if self.writer:
-            try:
-                self.writer.close()
-                try:
-                    await self.writer.wait_closed()
-                except Exception:
-                    pass
-            except Exception:
-                pass
+        if self.resync_task:
+            self.resync_task.cancel()
+        if self._activity_unsub:
+            self._activity_unsub()
+            self._activity_unsub = None
+
+        if self.transport:
+            self.transport.close()
+        self.transport = None
+        self.protocol = None
+        self._fail_pending(ConnectionResetError("Bridge stopped"))
+        self._offline.clear()
 
         _LOGGER.info("iPano Plus bridge stopped")
 
@@ -477,8 +1064,26 @@ class iPanoBridge:
             "connected": self.connected,
             "host": self.host,
             "port": self.port,
+            "model": self.model["name"],
             "last_heartbeat": self.last_heartbeat,
             "buttons": self.button_states,
             "relays": self.relay_states,
             "proximity": self.proximity_state,
+            "resync_count": self.resync_count,
+            "drift_events": self.drift_events,
+            "last_resync": self.last_resync,
+            "rule_executions": self.rule_executions,
+            "rule_latency_last_ms": self.rule_latency_last,
+            "rule_latency_max_ms": self.rule_latency_max,
+            "proxy_subscribers": self.proxy.subscriber_count if self.proxy else None,
+            "proxy_dropped": self.proxy.dropped if self.proxy else None,
+            "frames_shed": self.frames_shed,
+            "inbound_yields": self.inbound_yields,
+            "inbound_hold_max_ms": round(self.inbound_hold_max * 1000, 3),
+            "offline_queued": len(self._offline),
+            "offline_buffered": self.offline_buffered,
+            "offline_flushed": self.offline_flushed,
+            "offline_dropped": self.offline_dropped,
+            "latency": {kind: histogram.as_dict() for kind, histogram in self.latency.items()},
+            "activity": self.activity.as_dict(),
         }
@@ -2,9 +2,20 @@
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_NAME
+from homeassistant.core import callback
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
 
-from .const import DOMAIN
+from .const import DOMAIN, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_NAME, DEFAULT_SUBNET, CONF_SUBNET, CONF_FLEET_MODE
+from .const import CONF_RESYNC_INTERVAL, DEFAULT_RESYNC_INTERVAL, CONF_LOCAL_RULES
+from .const import CONF_PROXY_PORT, CONF_PROXY_BIND, DEFAULT_PROXY_BIND
+from .const import CONF_MODEL, MODEL_AUTO, PANEL_MODELS, NUM_BUTTONS, NUM_RELAYS
 from .bridge import iPanoBridge
+from .discovery import async_scan_subnet
+from .rules import parse_rules
+
+
+# "auto" asks the panel on first connect; otherwise the model is fixed
+MODEL_CHOICES = {MODEL_AUTO: "Detect automatically", **{key: model["name"] for key, model in PANEL_MODELS.items()}}
 
 
 class iPanoPlusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -12,11 +23,27 @@ class iPanoPlusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    def __init__(self):
+        """Initialize the flow."""
+        self._discovered = []
+        self._port = DEFAULT_PORT
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow."""
+        return iPanoPlusOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
+        return self.async_show_menu(step_id="user", menu_options=["scan", "manual"])
+
+    async def async_step_manual(self, user_input=None):
+        """Handle manual entry of a panel address."""
         errors = {}
 
         if user_input is not None:
+            self._async_abort_entries_match({CONF_HOST: user_input.get(CONF_HOST)})
             try:
                 bridge = iPanoBridge(self.hass, user_input)
                 if await bridge.test_connection():
@@ -26,7 +53,8 @@ class iPanoPlusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         data={
                             CONF_HOST: user_input.get(CONF_HOST),
                             CONF_PORT: user_input.get(CONF_PORT),
-                            CONF_NAME: user_input.get(CONF_NAME, "iPano Plus"),
+                            CONF_NAME: user_input.get(CONF_NAME, DEFAULT_NAME),
+                            CONF_MODEL: user_input.get(CONF_MODEL, MODEL_AUTO),
                         },
                     )
                 errors["base"] = "cannot_connect"
@@ -34,13 +62,117 @@ class iPanoPlusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["base"] = "cannot_connect"
 
         return self.async_show_form(
-            step_id="user",
+            step_id="manual",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HOST, default=DEFAULT_HOST): str,
+                    vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
+                    vol.Optional(CONF_NAME, default=DEFAULT_NAME): str,
+                    vol.Optional(CONF_MODEL, default=MODEL_AUTO): vol.In(MODEL_CHOICES),
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_scan(self, user_input=None):
+        """Scan a subnet for panels listening on the iPano port."""
+        errors = {}
+
+        if user_input is not None:
+            self._port = user_input.get(CONF_PORT, DEFAULT_PORT)
+            configured = {entry.data.get(CONF_HOST) for entry in self._async_current_entries()}
+            try:
+                self._discovered = await async_scan_subnet(
+                    user_input[CONF_SUBNET], self._port, exclude=configured
+                )
+            except ValueError:
+                errors[CONF_SUBNET] = "invalid_subnet"
+            else:
+                if self._discovered:
+                    return await self.async_step_pick()
+                errors["base"] = "no_devices_found"
+
+        return self.async_show_form(
+            step_id="scan",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_SUBNET, default=DEFAULT_SUBNET): str,
+                    vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_pick(self, user_input=None):
+        """Let the user pick one of the discovered panels."""
+        if user_input is not None:
+            host = user_input[CONF_HOST]
+            self._async_abort_entries_match({CONF_HOST: host})
+            return self.async_create_entry(
+                title=f"iPano Plus {host}",
+                data={
+                    CONF_HOST: host,
+                    CONF_PORT: self._port,
+                    CONF_NAME: user_input.get(CONF_NAME, DEFAULT_NAME),
+                    CONF_MODEL: user_input.get(CONF_MODEL, MODEL_AUTO),
+                },
+            )
+
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HOST, default=self._discovered[0]): vol.In(self._discovered),
+                    vol.Optional(CONF_NAME, default=DEFAULT_NAME): str,
+                    vol.Optional(CONF_MODEL, default=MODEL_AUTO): vol.In(MODEL_CHOICES),
+                }
+            ),
+        )
+
+
+class iPanoPlusOptionsFlow(config_entries.OptionsFlow):
+    """Handle iPano Plus options."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        errors = {}
+        description_placeholders = {"rules_error": ""}
+
+        if user_input is not None:
+            # Validate against the running panel's channels when it is loaded
+            bridge = self.hass.data.get(DOMAIN, {}).get(self._entry.entry_id)
+            num_buttons = bridge.num_buttons if bridge else NUM_BUTTONS
+            num_relays = bridge.num_relays if bridge else NUM_RELAYS
+            try:
+                parse_rules(user_input.get(CONF_LOCAL_RULES, ""), num_buttons, num_relays)
+            except ValueError as err:
+                errors[CONF_LOCAL_RULES] = "invalid_rules"
+                description_placeholders["rules_error"] = str(err)
+            else:
+                return self.async_create_entry(title="", data={**self._entry.options, **user_input})
+
+        options = {**self._entry.options, **(user_input or {})}
+        return self.async_show_form(
+            step_id="init",
             data_schema=vol.Schema(
                 {
-                    vol.Required(CONF_HOST, default="192.168.2.120"): str,
-                    vol.Required(CONF_PORT, default=3124): int,
-                    vol.Optional(CONF_NAME, default="iPano Plus"): str,
+                    vol.Optional(CONF_FLEET_MODE, default=options.get(CONF_FLEET_MODE, False)): bool,
+                    vol.Optional(
+                        CONF_RESYNC_INTERVAL, default=options.get(CONF_RESYNC_INTERVAL, DEFAULT_RESYNC_INTERVAL)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+                    vol.Optional(
+                        CONF_LOCAL_RULES, default=options.get(CONF_LOCAL_RULES, "")
+                    ): TextSelector(TextSelectorConfig(multiline=True)),
+                    vol.Optional(CONF_PROXY_PORT, default=options.get(CONF_PROXY_PORT, 0)): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=65535)
+                    ),
+                    vol.Optional(CONF_PROXY_BIND, default=options.get(CONF_PROXY_BIND, DEFAULT_PROXY_BIND)): str,
                 }
             ),
             errors=errors,
+            description_placeholders=description_placeholders,
         )
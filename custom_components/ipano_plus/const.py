@@ -6,16 +6,64 @@ DOMAIN = "ipano_plus"
 DEFAULT_PORT = 3124
 DEFAULT_NAME = "iPano Plus"
 DEFAULT_HOST = "192.168.2.120"
+DEFAULT_SUBNET = "192.168.2.0/24"
 
 # Configuration keys
 CONF_HOST = "host"
 CONF_PORT = "port"
 CONF_NAME = "name"
+CONF_MODEL = "model"
+CONF_SUBNET = "subnet"
+CONF_FLEET_MODE = "fleet_mode"
+CONF_RESYNC_INTERVAL = "resync_interval"
+CONF_LOCAL_RULES = "local_rules"
+CONF_PROXY_PORT = "proxy_port"
+CONF_PROXY_BIND = "proxy_bind"
+
+# Connection timing (seconds)
+HEARTBEAT_INTERVAL = 15
+RECONNECT_DELAY = 5
+RECONNECT_MAX_DELAY = 60
+REQUEST_TIMEOUT = 3.0
+
+# Relay/backlight commands issued while disconnected are kept this long and
+# flushed after reconnect; only the latest command per channel is kept
+OFFLINE_COMMAND_TTL = 30
+OFFLINE_BUFFER_SIZE = 32
+
+# Inbound frames handled per event loop iteration before yielding; beyond
+# INBOUND_SHED_BACKLOG queued frames, repeated identical state frames are shed
+INBOUND_FRAME_BUDGET = 50
+INBOUND_TIME_BUDGET = 0.002
+INBOUND_SHED_BACKLOG = 200
+
+# Background state reconciliation; each bridge's interval is jittered by
+# +/- RESYNC_JITTER so a fleet does not resync in lockstep. 0 disables it.
+DEFAULT_RESYNC_INTERVAL = 300
+RESYNC_JITTER = 0.2
+
+# Local fan-out proxy (port 0 disables it)
+DEFAULT_PROXY_BIND = "127.0.0.1"
+PROXY_MAX_BUFFER = 64 * 1024
+
+# Fleet manager: one timer ticks every FLEET_TICK seconds and visits one wheel
+# slot per tick, so each bridge is checked every FLEET_TICK * FLEET_WHEEL_SLOTS.
+FLEET_TICK = 1.0
+FLEET_WHEEL_SLOTS = 5
+FLEET_LIVENESS_TIMEOUT = 45
+FLEET_MAX_BACKOFF = 60
+
+# LAN discovery
+DISCOVERY_CONCURRENCY = 256
+DISCOVERY_CONNECT_TIMEOUT = 0.5
+DISCOVERY_HANDSHAKE_TIMEOUT = 1.5
+DISCOVERY_MAX_HOSTS = 1024
 
 # Message types
 MSG_TYPE_BUTTON = 0
 MSG_TYPE_BACKLIGHT_CHANGE = 10
 MSG_TYPE_BACKLIGHT_CONTROL = 11
+MSG_TYPE_BACKLIGHT_QUERY = 12
 MSG_TYPE_SCREEN_WAKE = 20
 MSG_TYPE_FOREGROUND_QUERY = 30
 MSG_TYPE_START_APPLICATION = 40
@@ -27,18 +75,46 @@ MSG_TYPE_PROXIMITY_SET = 61
 MSG_TYPE_PROXIMITY_QUERY = 62
 MSG_TYPE_HEARTBEAT = 500
 
-# For 6-inch iPano Plus
-NUM_BUTTONS = 4
-NUM_RELAYS = 2
-BUTTON_KEYCODES = [131, 132, 133, 134]
+# Reply message type the panel answers each request type with
+REPLY_TYPES = {
+    MSG_TYPE_BACKLIGHT_QUERY: MSG_TYPE_BACKLIGHT_CHANGE,
+    MSG_TYPE_FOREGROUND_QUERY: MSG_TYPE_FOREGROUND_QUERY,
+    MSG_TYPE_START_APPLICATION: MSG_TYPE_START_APPLICATION,
+    MSG_TYPE_RELAY_QUERY: MSG_TYPE_RELAY_CHANGE,
+    MSG_TYPE_PROXIMITY_SET: MSG_TYPE_PROXIMITY_SET,
+    MSG_TYPE_PROXIMITY_QUERY: MSG_TYPE_PROXIMITY_QUERY,
+    MSG_TYPE_HEARTBEAT: MSG_TYPE_HEARTBEAT,
+}
 
-# Button mappings
-BUTTON_MAP = {
-    131: "button_1",
-    132: "button_2",
-    133: "button_3",
-    134: "button_4",
+# Panel variants. Each entry sizes the bridge state, the entity lists and the
+# keycode lookup; "auto" picks the smallest variant that has as many relays
+# as the panel reports on connect.
+MODEL_AUTO = "auto"
+DEFAULT_MODEL = "plus_6"
+PANEL_MODELS = {
+    "plus_6": {
+        "name": "Plus 6-inch",
+        "buttons": 4,
+        "relays": 2,
+        "keycodes": [131, 132, 133, 134],
+    },
+    "plus_6_dual": {
+        "name": "Plus 6-inch (dual base)",
+        "buttons": 4,
+        "relays": 6,
+        "keycodes": [131, 132, 133, 134],
+    },
 }
+MAX_BUTTONS = max(model["buttons"] for model in PANEL_MODELS.values())
+MAX_RELAYS = max(model["relays"] for model in PANEL_MODELS.values())
+
+# Default variant (6-inch iPano Plus, single base)
+NUM_BUTTONS = PANEL_MODELS[DEFAULT_MODEL]["buttons"]
+NUM_RELAYS = PANEL_MODELS[DEFAULT_MODEL]["relays"]
+BUTTON_KEYCODES = PANEL_MODELS[DEFAULT_MODEL]["keycodes"]
+
+# Button mappings
+BUTTON_MAP = {keycode: f"button_{num}" for num, keycode in enumerate(BUTTON_KEYCODES, start=1)}
 
 # Backlight colors
 BACKLIGHT_COLORS = {
@@ -58,6 +134,17 @@ SIGNAL_BACKLIGHT_UPDATE = f"{DOMAIN}_backlight_update"
 SIGNAL_RELAY_UPDATE = f"{DOMAIN}_relay_update"
 SIGNAL_BUTTON_EVENT = f"{DOMAIN}_button_event"
 SIGNAL_PROXIMITY_UPDATE = f"{DOMAIN}_proximity_update"
+SIGNAL_RESYNC = f"{DOMAIN}_resync"  # suffixed with the config entry id
+SIGNAL_RULE_EXECUTED = f"{DOMAIN}_rule_executed"  # suffixed with the config entry id
+SIGNAL_ACTIVITY_UPDATE = f"{DOMAIN}_activity_update"  # suffixed with the config entry id
+
+# Channel kinds traced from frame receipt to entity state write
+LATENCY_KINDS = ("button", "relay", "backlight", "proximity")
+
+# Websocket stream of live panel activity (channels are the LATENCY_KINDS)
+WS_TYPE_SUBSCRIBE = f"{DOMAIN}/subscribe"
+WS_BATCH_INTERVAL = 0.016  # one batch per animation frame
+WS_QUEUE_SIZE = 256  # button events held per subscription between batches
 
 # Service names
 SERVICE_WAKE_SCREEN = "wake_screen"
@@ -67,3 +154,8 @@ SERVICE_PULSE_BACKLIGHT = "pulse_backlight"
 SERVICE_FADE_BACKLIGHT = "fade_backlight"
 SERVICE_BREATHING_BACKLIGHT = "breathing_backlight"
 SERVICE_CONTROL_RELAY = "control_relay"
+SERVICE_FLEET_STATUS = "fleet_status"
+SERVICE_SET_PROXIMITY = "set_proximity"
+SERVICE_START_APPLICATION = "start_application"
+SERVICE_APPLY_SCENE = "apply_scene"
+SERVICE_PROFILE = "profile"
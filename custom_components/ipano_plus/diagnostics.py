@@ -0,0 +1,24 @@
+"""Diagnostics support for iPano Plus."""
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    bridge = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        # Includes the receive -> state written latency histograms per channel kind
+        "bridge": async_redact_data(await bridge.async_get_connection_status(), TO_REDACT) if bridge else None,
+    }
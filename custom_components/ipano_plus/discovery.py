@@ -0,0 +1,93 @@
+"""LAN discovery for iPano Plus panels."""
+import asyncio
+import ipaddress
+import json
+import logging
+from typing import Iterable, List
+
+from .const import (
+    DEFAULT_PORT,
+    DISCOVERY_CONCURRENCY,
+    DISCOVERY_CONNECT_TIMEOUT,
+    DISCOVERY_HANDSHAKE_TIMEOUT,
+    DISCOVERY_MAX_HOSTS,
+    MSG_TYPE_HEARTBEAT,
+)
+from .frames import HEARTBEAT
+
+_LOGGER = logging.getLogger(__name__)
+
+HEARTBEAT_FRAME = HEARTBEAT.raw
+
+
+def subnet_hosts(subnet: str) -> List[str]:
+    """Return the host addresses of a subnet, raising ValueError if it is unusable."""
+    network = ipaddress.ip_network(subnet.strip(), strict=False)
+    if network.num_addresses > DISCOVERY_MAX_HOSTS + 2:
+        raise ValueError(f"Subnet {network} is larger than {DISCOVERY_MAX_HOSTS} hosts")
+    if network.num_addresses == 1:
+        return [str(network.network_address)]
+    return [str(host) for host in network.hosts()]
+
+
+async def async_probe_host(
+    host: str,
+    port: int = DEFAULT_PORT,
+    connect_timeout: float = DISCOVERY_CONNECT_TIMEOUT,
+    handshake_timeout: float = DISCOVERY_HANDSHAKE_TIMEOUT,
+) -> bool:
+    """Return True if host accepts a TCP connection and answers a heartbeat."""
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout=connect_timeout
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+
+    try:
+        writer.write(HEARTBEAT_FRAME)
+        await writer.drain()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + handshake_timeout
+        while (remaining := deadline - loop.time()) > 0:
+            line = await asyncio.wait_for(reader.readline(), timeout=remaining)
+            if not line:
+                return False
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(data, dict) and data.get("type") == MSG_TYPE_HEARTBEAT:
+                return True
+        return False
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+
+async def async_scan_subnet(
+    subnet: str,
+    port: int = DEFAULT_PORT,
+    exclude: Iterable[str] = (),
+    concurrency: int = DISCOVERY_CONCURRENCY,
+) -> List[str]:
+    """Probe every host of subnet concurrently and return the panels that answered."""
+    excluded = set(exclude)
+    hosts = [host for host in subnet_hosts(subnet) if host not in excluded]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _probe(host: str) -> bool:
+        async with semaphore:
+            return await async_probe_host(host, port)
+
+    _LOGGER.debug(f"Scanning {len(hosts)} hosts in {subnet} for iPano panels on port {port}")
+    results = await asyncio.gather(*(_probe(host) for host in hosts))
+    found = [host for host, ok in zip(hosts, results) if ok]
+    _LOGGER.info(f"Discovery found {len(found)} iPano panel(s) in {subnet}: {found}")
+    return found
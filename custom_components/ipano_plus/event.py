@@ -0,0 +1,86 @@
+"""Event platform for iPano Plus."""
+import logging
+from homeassistant.components.event import EventDeviceClass, EventEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN, BUTTON_MAP, SIGNAL_BUTTON_EVENT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
+    """Set up iPano Plus button events from config entry."""
+    _LOGGER.debug("Setting up iPano button events")
+
+    bridge = hass.data.get(DOMAIN, {}).get(config_entry.entry_id)
+    button_names = bridge.button_map.values() if bridge else BUTTON_MAP.values()
+
+    # One event entity per button of this panel model
+    async_add_entities(
+        iPanoButtonEvent(config_entry, button_id.replace("_", " ").capitalize(), button_id)
+        for button_id in button_names
+    )
+
+
+class iPanoButtonEvent(EventEntity):
+    """Presses of an iPano button.
+
+    Fires ``pressed`` and ``released`` plus ``held`` on the first auto-repeat
+    of a long press; further repeats are not written.
+    """
+
+    _attr_device_class = EventDeviceClass.BUTTON
+    _attr_event_types = ["pressed", "released", "held"]
+    _attr_should_poll = False
+
+    def __init__(self, config_entry, name, button_id):
+        self._config_entry = config_entry
+        self._attr_name = f"iPano {name}"
+        self._attr_unique_id = f"{config_entry.entry_id}_{button_id}_event"
+        self._button_id = button_id
+        self._dispatcher_unsub = None
+
+    async def async_added_to_hass(self) -> None:
+        """Register dispatcher callback for button events."""
+        self._dispatcher_unsub = async_dispatcher_connect(
+            self.hass, f"{SIGNAL_BUTTON_EVENT}_{self._config_entry.entry_id}", self._handle_button_event
+        )
+
+    @callback
+    def _handle_button_event(self, event):
+        """Handle button press/release event from dispatcher."""
+        if event.get("button") != self._button_id:
+            return
+
+        repeat_count = event.get("repeat_count", 0)
+        if event.get("action") != "pressed":
+            event_type = "released"
+        elif not repeat_count:
+            event_type = "pressed"
+        elif repeat_count == 1:
+            event_type = "held"
+        else:
+            return
+
+        self._trigger_event(event_type)
+        self.async_write_ha_state()
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if bridge:
+            bridge.record_latency("button", event.get("received"))
+
+    @property
+    def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        return {
+            "identifiers": {("ipano", self._config_entry.entry_id)},
+            "name": self._config_entry.data.get("name", "iPano Plus"),
+            "manufacturer": "iPano",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
+        }
+
+    async def async_will_remove_from_hass(self):
+        if self._dispatcher_unsub:
+            self._dispatcher_unsub()
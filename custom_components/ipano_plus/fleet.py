@@ -0,0 +1,94 @@
+"""Shared timer wheel for large iPano Plus fleets."""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, FLEET_TICK, FLEET_WHEEL_SLOTS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class iPanoFleet:
+    """Drive heartbeat, liveness and reconnect checks for many bridges.
+
+    A single loop timer fires every FLEET_TICK seconds and visits one slot of
+    the wheel, so the number of tasks and wakeups does not grow with the fleet.
+    """
+
+    def __init__(self, hass: HomeAssistant, tick: float = FLEET_TICK, slots: int = FLEET_WHEEL_SLOTS):
+        """Initialize the fleet."""
+        self.hass = hass
+        self.tick = tick
+        self._wheel: List[Set[Any]] = [set() for _ in range(slots)]
+        self._slot_of: Dict[Any, int] = {}
+        self._cursor = 0
+        self._timer = None
+        self.ticks = 0
+
+    @property
+    def bridges(self) -> List[Any]:
+        """Return the registered bridges."""
+        return list(self._slot_of)
+
+    @callback
+    def async_register(self, bridge) -> None:
+        """Add a bridge to the least loaded wheel slot."""
+        if bridge in self._slot_of:
+            return
+        slot = min(range(len(self._wheel)), key=lambda idx: len(self._wheel[idx]))
+        self._wheel[slot].add(bridge)
+        self._slot_of[bridge] = slot
+        _LOGGER.debug(f"Fleet registered {bridge.name} in slot {slot} ({len(self._slot_of)} bridges)")
+
+        if self._timer is None:
+            self._schedule()
+
+    @callback
+    def async_unregister(self, bridge) -> None:
+        """Remove a bridge; stop the timer when the fleet is empty."""
+        slot = self._slot_of.pop(bridge, None)
+        if slot is not None:
+            self._wheel[slot].discard(bridge)
+
+        if not self._slot_of and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            _LOGGER.debug("Fleet is empty, timer stopped")
+
+    def _schedule(self) -> None:
+        self._timer = self.hass.loop.call_later(self.tick, self._async_tick)
+
+    @callback
+    def _async_tick(self) -> None:
+        """Check the bridges of the current slot and advance the wheel."""
+        self.ticks += 1
+        now = time.time()
+        for bridge in list(self._wheel[self._cursor]):
+            try:
+                bridge._async_fleet_check(now)
+            except Exception as err:
+                _LOGGER.error(f"Fleet check failed for {bridge.name}: {err}")
+
+        self._cursor = (self._cursor + 1) % len(self._wheel)
+        self._schedule()
+
+    def async_get_status(self) -> Dict[str, Any]:
+        """Return fleet-wide connection status."""
+        bridges = self.bridges
+        connected = [bridge for bridge in bridges if bridge.connected]
+        return {
+            "panels": len(bridges),
+            "connected": len(connected),
+            "disconnected": sorted(bridge.name for bridge in bridges if not bridge.connected),
+            "tick_interval": self.tick,
+            "check_interval": self.tick * len(self._wheel),
+            "slot_sizes": [len(slot) for slot in self._wheel],
+            "ticks": self.ticks,
+        }
+
+
+def get_fleet(hass: HomeAssistant) -> Optional[iPanoFleet]:
+    """Return the shared fleet if one is running."""
+    return hass.data.get(DOMAIN, {}).get("_fleet")
@@ -0,0 +1,78 @@
+"""Pre-encoded command frames for the finite panel command space."""
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .const import (
+    BACKLIGHT_COLORS,
+    MSG_TYPE_BACKLIGHT_CONTROL,
+    MSG_TYPE_BACKLIGHT_QUERY,
+    MSG_TYPE_FOREGROUND_QUERY,
+    MSG_TYPE_HEARTBEAT,
+    MSG_TYPE_PROXIMITY_QUERY,
+    MSG_TYPE_RELAY_CONTROL,
+    MSG_TYPE_RELAY_QUERY,
+    MSG_TYPE_SCREEN_WAKE,
+)
+
+FrameKey = Tuple[int, Optional[int], Any]
+
+# Commands without a channel or parameters
+PLAIN_COMMANDS = (
+    MSG_TYPE_SCREEN_WAKE,
+    MSG_TYPE_RELAY_QUERY,
+    MSG_TYPE_BACKLIGHT_QUERY,
+    MSG_TYPE_PROXIMITY_QUERY,
+    MSG_TYPE_FOREGROUND_QUERY,
+)
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """Encode one message as a newline-terminated JSON frame."""
+    return (json.dumps(message) + "\n").encode()
+
+
+class iPanoFrame(dict):
+    """A command message that carries its wire encoding.
+
+    It is still a plain message dict for logging, the offline buffer and
+    the proxy, but writers send ``raw`` instead of encoding it again.
+    Frames are shared, so they must never be modified.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, message: Dict[str, Any]):
+        """Initialize the frame and encode it once."""
+        super().__init__(message)
+        self.raw = encode_message(message)
+
+
+HEARTBEAT = iPanoFrame({"type": MSG_TYPE_HEARTBEAT, "data": "ok", "state": 200, "msg": ""})
+
+
+def build_frame_table(num_buttons: int, num_relays: int) -> Dict[FrameKey, iPanoFrame]:
+    """Return every fixed command of a panel keyed by (type, num, val).
+
+    Commands without a channel use ``(type, None, None)``.
+    """
+    table: Dict[FrameKey, iPanoFrame] = {(MSG_TYPE_HEARTBEAT, None, None): HEARTBEAT}
+    for msg_type in PLAIN_COMMANDS:
+        table[(msg_type, None, None)] = iPanoFrame({"type": msg_type})
+    for num in range(num_buttons):
+        for val in BACKLIGHT_COLORS:
+            table[(MSG_TYPE_BACKLIGHT_CONTROL, num, val)] = iPanoFrame(
+                {"type": MSG_TYPE_BACKLIGHT_CONTROL, "data": {"num": num, "val": val}}
+            )
+    for num in range(num_relays):
+        for val in (False, True):
+            table[(MSG_TYPE_RELAY_CONTROL, num, val)] = iPanoFrame(
+                {"type": MSG_TYPE_RELAY_CONTROL, "data": {"num": num, "val": val}}
+            )
+    return table
+
+
+def encode_messages(messages: Iterable[Dict[str, Any]]) -> bytes:
+    """Encode messages for a single write, reusing pre-encoded frames."""
+    return b"".join(
+        message.raw if isinstance(message, iPanoFrame) else encode_message(message) for message in messages
+    )
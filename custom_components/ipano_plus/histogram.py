@@ -0,0 +1,38 @@
+"""Fixed-bucket latency histograms shared by the profiler and latency tracing."""
+from typing import Any, Dict
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0, float("inf"))
+
+
+class LatencyHistogram:
+    """Count call durations into fixed millisecond buckets."""
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        """Record one call."""
+        self.count += 1
+        self.total += elapsed_ms
+        self.max = max(self.max, elapsed_ms)
+        for idx, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed_ms <= bound:
+                self.buckets[idx] += 1
+                break
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the histogram as a serializable dict."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 4) if self.count else 0.0,
+            "max_ms": round(self.max, 4),
+            "buckets": {
+                (f"<={bound:g}ms" if bound != float("inf") else "inf"): hits
+                for bound, hits in zip(LATENCY_BUCKETS, self.buckets)
+            },
+        }
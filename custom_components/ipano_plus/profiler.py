@@ -0,0 +1,186 @@
+"""On-demand profiling of the iPano Plus bridges.
+
+Nothing here runs until the ``profile`` service is called. For the duration
+of a run the bridge hot paths are wrapped with timing shims (as instance
+attributes, removed again afterwards), cProfile records the event loop
+thread and, optionally, tracemalloc records allocations. The report is
+written to the Home Assistant config directory.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from homeassistant.core import HomeAssistant
+
+from . import bridge as bridge_module
+from .histogram import LatencyHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bridge methods timed during a run; _send_message is a coroutine
+PROFILED_METHODS = (
+    "_process_message",
+    "_handle_button_event",
+    "_handle_relay_change",
+    "_handle_backlight_change",
+    "_handle_proximity",
+    "_run_local_rules",
+    "_write_messages",
+)
+PROFILED_COROUTINES = ("_send_message",)
+
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+
+_PACKAGE_DIR = os.path.dirname(__file__)
+
+
+class iPanoProfiler:
+    """One profiling run over a set of bridges."""
+
+    def __init__(self, hass: HomeAssistant, bridges: List[Any], duration: float, trace_memory: bool = False):
+        """Initialize the run."""
+        self.hass = hass
+        self.bridges = bridges
+        self.duration = duration
+        self.trace_memory = trace_memory
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._profile = cProfile.Profile()
+        self._started_tracemalloc = False
+        self._original_dispatch = None
+
+    def _histogram(self, key: str) -> LatencyHistogram:
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        return histogram
+
+    def _timed(self, key: str, func: Callable) -> Callable:
+        histogram = self._histogram(key)
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.add((time.perf_counter() - started) * 1000)
+
+        return wrapper
+
+    def _timed_coroutine(self, key: str, func: Callable) -> Callable:
+        histogram = self._histogram(key)
+
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.add((time.perf_counter() - started) * 1000)
+
+        return wrapper
+
+    def _timed_dispatch(self, original: Callable) -> Callable:
+        # @callback targets run synchronously inside the send, so this times the entity callbacks
+        def wrapper(hass, signal, *args):
+            started = time.perf_counter()
+            try:
+                return original(hass, signal, *args)
+            finally:
+                self._histogram(f"dispatch {signal}").add((time.perf_counter() - started) * 1000)
+
+        return wrapper
+
+    def _install(self) -> None:
+        for bridge in self.bridges:
+            for name in PROFILED_METHODS:
+                setattr(bridge, name, self._timed(f"{bridge.name} {name}", getattr(bridge, name)))
+            for name in PROFILED_COROUTINES:
+                setattr(bridge, name, self._timed_coroutine(f"{bridge.name} {name}", getattr(bridge, name)))
+
+        self._original_dispatch = bridge_module.async_dispatcher_send
+        bridge_module.async_dispatcher_send = self._timed_dispatch(self._original_dispatch)
+
+    def _uninstall(self) -> None:
+        # Dropping the instance attributes puts the plain methods back
+        for bridge in self.bridges:
+            for name in PROFILED_METHODS + PROFILED_COROUTINES:
+                bridge.__dict__.pop(name, None)
+
+        if self._original_dispatch is not None:
+            bridge_module.async_dispatcher_send = self._original_dispatch
+            self._original_dispatch = None
+
+    async def async_run(self) -> Dict[str, Any]:
+        """Profile for the configured duration and write the report."""
+        snapshot = None
+        try:
+            self._profile.enable()
+        except ValueError as err:
+            # Python 3.12+ allows only one profiler per thread
+            raise RuntimeError(f"Another profiler is already active: {err}") from err
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        self._install()
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            self._profile.disable()
+            self._uninstall()
+            if self.trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+
+        report = self._format_report(snapshot)
+        path = self.hass.config.path(f"ipano_plus_profile_{datetime.now():%Y%m%d_%H%M%S}.txt")
+        await self.hass.async_add_executor_job(_write_file, path, report)
+        _LOGGER.info(f"iPano profile written to {path}")
+
+        return {
+            "file": path,
+            "duration": self.duration,
+            "latency": {key: histogram.as_dict() for key, histogram in sorted(self.histograms.items())},
+        }
+
+    def _format_report(self, snapshot) -> str:
+        out = io.StringIO()
+        out.write(f"iPano Plus profile, {self.duration:g}s, panels: {', '.join(b.name for b in self.bridges)}\n\n")
+
+        out.write("== Latency per handler (ms) ==\n")
+        for key, histogram in sorted(self.histograms.items()):
+            stats = histogram.as_dict()
+            buckets = " ".join(f"{label}:{hits}" for label, hits in stats["buckets"].items())
+            out.write(
+                f"{key}: n={stats['count']} mean={stats['mean_ms']} max={stats['max_ms']}  {buckets}\n"
+            )
+
+        stats = pstats.Stats(self._profile, stream=out)
+        out.write("\n== Top functions of the integration (cumulative) ==\n")
+        stats.sort_stats("cumulative").print_stats(r"ipano_plus/(?!profiler\.py)", TOP_FUNCTIONS)
+        out.write("\n== Top functions overall (internal time) ==\n")
+        stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+
+        if snapshot is not None:
+            out.write("\n== Allocation sites in the integration ==\n")
+            filtered = snapshot.filter_traces(
+                [tracemalloc.Filter(True, os.path.join(_PACKAGE_DIR, "*")), tracemalloc.Filter(False, __file__)]
+            )
+            for stat in filtered.statistics("lineno")[:TOP_ALLOCATIONS]:
+                out.write(f"{stat}\n")
+
+        return out.getvalue()
+
+
+def _write_file(path: str, content: str) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(content)
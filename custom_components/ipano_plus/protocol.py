@@ -0,0 +1,145 @@
+"""asyncio protocol for the iPano Plus panel link."""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from .const import INBOUND_FRAME_BUDGET, INBOUND_SHED_BACKLOG, INBOUND_TIME_BUDGET
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class iPanoProtocol(asyncio.Protocol):
+    """Split the panel byte stream into newline-delimited frames for the bridge.
+
+    Frames are parsed straight from data_received, a dropped link is reported
+    from connection_lost, and pause_writing/resume_writing gate drain() so that
+    senders only wait while the transport buffer is full.
+
+    At most INBOUND_FRAME_BUDGET frames or INBOUND_TIME_BUDGET seconds are
+    processed per loop iteration. The rest waits in a backlog, reading is
+    paused until it is worked off, and while the backlog is long, repeated
+    identical state frames are shed. Button frames are never shed, and
+    nothing is shed while a request is waiting for its reply.
+    """
+
+    def __init__(self, bridge):
+        """Initialize the protocol for a bridge."""
+        self._bridge = bridge
+        self._buffer = b""
+        self._paused = False
+        self._drain_waiters: List[asyncio.Future] = []
+        self._closed = False
+        self._backlog: Deque[Tuple[bytes, float]] = deque()
+        self._continue: Optional[asyncio.Handle] = None
+        self._reading_paused = False
+        self.transport: Optional[asyncio.Transport] = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        """Remember the transport once the TCP connection is up."""
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        """Hand every complete line to the bridge, tagged with its receive time."""
+        if self._bridge.protocol is not self:
+            # A superseded link must not feed frames in twice
+            return
+        received = time.monotonic()
+        self._bridge.last_rx = time.time()
+        if self._bridge.proxy is not None:
+            self._bridge.proxy.broadcast(data)
+        self._buffer += data
+        if b"\n" not in data:
+            return
+
+        *lines, self._buffer = self._buffer.split(b"\n")
+        self._backlog.extend((line, received) for line in lines)
+        if self._continue is None:
+            self._process_backlog()
+
+    def _process_backlog(self) -> None:
+        """Process queued frames within the budget, then yield to the loop."""
+        self._continue = None
+        bridge = self._bridge
+        backlog = self._backlog
+        shedding = len(backlog) > INBOUND_SHED_BACKLOG
+        started = time.perf_counter()
+        processed = 0
+        previous = None
+
+        while backlog:
+            if processed >= INBOUND_FRAME_BUDGET or time.perf_counter() - started > INBOUND_TIME_BUDGET:
+                bridge.inbound_yields += 1
+                if not self._reading_paused:
+                    self._reading_paused = True
+                    self.transport.pause_reading()
+                self._continue = asyncio.get_running_loop().call_soon(self._process_backlog)
+                break
+
+            line, received = backlog.popleft()
+            line = line.strip()
+            if not line:
+                continue
+            # Under overload a copy of the state frame just processed adds nothing.
+            # Never shed while requests wait: each of them needs its own reply frame.
+            if shedding and line == previous and b"keyCode" not in line and not bridge._pending:
+                bridge.frames_shed += 1
+                continue
+            previous = line
+            bridge._process_message(line.decode("utf-8", errors="ignore"), received)
+            processed += 1
+
+        if self._continue is None and self._reading_paused and not self._closed:
+            self._reading_paused = False
+            self.transport.resume_reading()
+        bridge.inbound_hold_max = max(bridge.inbound_hold_max, time.perf_counter() - started)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Tell the bridge the link is gone and release blocked senders."""
+        _LOGGER.debug(f"Protocol connection lost: {exc}")
+        self._buffer = b""
+        self._closed = True
+        self._backlog.clear()
+        if self._continue is not None:
+            self._continue.cancel()
+            self._continue = None
+        self._wake_drain_waiters(exc or ConnectionResetError("Connection lost"))
+        if self._paused and self._bridge.proxy is not None:
+            self._bridge.proxy.resume_commands()
+        self._bridge._handle_connection_lost(self, exc)
+
+    def pause_writing(self) -> None:
+        """Transport buffer is above the high-water mark."""
+        self._paused = True
+        if self._bridge.proxy is not None:
+            self._bridge.proxy.pause_commands()
+        _LOGGER.debug("Panel link paused writing")
+
+    def resume_writing(self) -> None:
+        """Transport buffer drained below the low-water mark."""
+        self._paused = False
+        self._wake_drain_waiters(None)
+        if self._bridge.proxy is not None:
+            self._bridge.proxy.resume_commands()
+        _LOGGER.debug("Panel link resumed writing")
+
+    async def drain(self) -> None:
+        """Wait until the transport accepts more data."""
+        if self._closed:
+            raise ConnectionResetError("Connection lost")
+        if not self._paused:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
+
+    def _wake_drain_waiters(self, exc: Optional[Exception]) -> None:
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
@@ -0,0 +1,138 @@
+"""Local fan-out proxy sharing one panel connection with several consumers."""
+import asyncio
+import json
+import logging
+from typing import Optional, Set
+
+from .const import PROXY_MAX_BUFFER
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class iPanoProxy:
+    """Re-broadcast panel traffic to local TCP subscribers.
+
+    Every byte received from the panel is written to all subscribers. Lines
+    sent by subscribers are parsed and written through the bridge, so they
+    never interleave with the bridge's own frames. A subscriber whose write
+    buffer is still above max_buffer when new data arrives is disconnected
+    instead of buffering without bound. While the panel link has paused
+    writing, reading from subscribers is paused too, so their commands
+    cannot grow the panel transport buffer either.
+    """
+
+    def __init__(self, bridge, host: str, port: int, max_buffer: int = PROXY_MAX_BUFFER):
+        """Initialize the proxy."""
+        self._bridge = bridge
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._subscribers: Set["_SubscriberProtocol"] = set()
+        self.dropped = 0
+        self.commands_paused = False
+
+    @property
+    def subscriber_count(self) -> int:
+        """Return the number of connected subscribers."""
+        return len(self._subscribers)
+
+    async def async_start(self) -> None:
+        """Start listening for subscribers."""
+        self._server = await asyncio.get_running_loop().create_server(
+            lambda: _SubscriberProtocol(self), self.host, self.port
+        )
+        _LOGGER.info(f"iPano proxy for {self._bridge.name} listening on {self.host}:{self.port}")
+
+    async def async_stop(self) -> None:
+        """Stop listening and disconnect all subscribers."""
+        # Subscribers go first: since Python 3.12.1 wait_closed() also waits for open connections
+        for subscriber in list(self._subscribers):
+            subscriber.transport.abort()
+        self._subscribers.clear()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def broadcast(self, data: bytes) -> None:
+        """Write panel data to every subscriber, dropping those that fall behind."""
+        for subscriber in list(self._subscribers):
+            transport = subscriber.transport
+            # Still holding more than max_buffer from earlier frames: it has fallen behind
+            if transport.get_write_buffer_size() > self.max_buffer:
+                self.dropped += 1
+                _LOGGER.warning(f"Dropping slow proxy subscriber {subscriber.peer} of {self._bridge.name}")
+                self._subscribers.discard(subscriber)
+                transport.abort()
+                continue
+            transport.write(data)
+
+    def pause_commands(self) -> None:
+        """Stop reading subscriber commands while the panel link is paused."""
+        self.commands_paused = True
+        for subscriber in self._subscribers:
+            subscriber.transport.pause_reading()
+
+    def resume_commands(self) -> None:
+        """Read subscriber commands again once the panel link drained."""
+        self.commands_paused = False
+        for subscriber in list(self._subscribers):
+            subscriber.transport.resume_reading()
+            subscriber.process_lines()
+            if self.commands_paused:
+                return
+
+    def _handle_command(self, subscriber: "_SubscriberProtocol", line: bytes) -> None:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            _LOGGER.debug(f"Ignoring invalid JSON from proxy subscriber {subscriber.peer}: {line!r}")
+            return
+        if not isinstance(message, dict):
+            return
+        self._bridge._write_message(message)
+
+
+class _SubscriberProtocol(asyncio.Protocol):
+    """One local consumer of the proxy."""
+
+    def __init__(self, proxy: iPanoProxy):
+        self._proxy = proxy
+        self._buffer = b""
+        self.transport: Optional[asyncio.Transport] = None
+        self.peer = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.peer = transport.get_extra_info("peername")
+        self._proxy._subscribers.add(self)
+        if self._proxy.commands_paused:
+            transport.pause_reading()
+        _LOGGER.debug(f"Proxy subscriber {self.peer} connected")
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer += data
+        if b"\n" not in data:
+            if len(self._buffer) > self._proxy.max_buffer:
+                self.transport.abort()
+            return
+        self.process_lines()
+
+    def process_lines(self) -> None:
+        """Hand complete lines to the proxy until the panel link pauses writing."""
+        if self._proxy.commands_paused or b"\n" not in self._buffer:
+            return
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for index, line in enumerate(lines):
+            if self._proxy.commands_paused:
+                # Keep the rest until the panel link has drained
+                self._buffer = b"\n".join(lines[index:] + [self._buffer])
+                return
+            line = line.strip()
+            if line:
+                self._proxy._handle_command(self, line)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._proxy._subscribers.discard(self)
+        _LOGGER.debug(f"Proxy subscriber {self.peer} disconnected: {exc}")
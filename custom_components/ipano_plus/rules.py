@@ -0,0 +1,63 @@
+"""Local button rules executed directly by the bridge.
+
+Rules are written one per line in the options flow:
+
+    button 1 pressed -> relay 1 toggle
+    button 1 pressed -> backlight 1 white
+    button 4 held -> relay 2 off
+
+Gestures are ``pressed``, ``released`` and ``held`` (first auto-repeat of a
+long press). Relay actions are ``on``, ``off`` and ``toggle``; backlight
+actions take a color from BACKLIGHT_COLORS. Blank lines and lines starting
+with ``#`` are ignored.
+"""
+import re
+from typing import Dict, List, Tuple
+
+from .const import BACKLIGHT_COLORS, NUM_BUTTONS, NUM_RELAYS
+
+GESTURES = ("pressed", "released", "held")
+RELAY_ACTIONS = ("on", "off", "toggle")
+COLOR_VALUES = {name: value for value, name in BACKLIGHT_COLORS.items()}
+
+_RULE_RE = re.compile(
+    r"^button\s+(\d+)\s+(\w+)\s*->\s*(relay|backlight)\s+(\d+)\s+(\w+)$", re.IGNORECASE
+)
+
+# (button number, gesture) -> [(channel, channel number, action)], numbers are 1-based
+RuleTable = Dict[Tuple[int, str], List[Tuple[str, int, str]]]
+
+
+def parse_rules(text: str, num_buttons: int = NUM_BUTTONS, num_relays: int = NUM_RELAYS) -> RuleTable:
+    """Parse the rules text, raising ValueError naming the first bad line."""
+    rules: RuleTable = {}
+    for lineno, raw in enumerate((text or "").splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        match = _RULE_RE.match(line)
+        if not match:
+            raise ValueError(f"Line {lineno}: expected 'button N gesture -> relay|backlight M action'")
+
+        button, gesture, channel, number, action = match.groups()
+        button, number = int(button), int(number)
+        gesture, channel, action = gesture.lower(), channel.lower(), action.lower()
+
+        if not 1 <= button <= num_buttons:
+            raise ValueError(f"Line {lineno}: button must be 1-{num_buttons}")
+        if gesture not in GESTURES:
+            raise ValueError(f"Line {lineno}: gesture must be one of {', '.join(GESTURES)}")
+        if channel == "relay":
+            if not 1 <= number <= num_relays:
+                raise ValueError(f"Line {lineno}: relay must be 1-{num_relays}")
+            if action not in RELAY_ACTIONS:
+                raise ValueError(f"Line {lineno}: relay action must be one of {', '.join(RELAY_ACTIONS)}")
+        else:
+            if not 1 <= number <= num_buttons:
+                raise ValueError(f"Line {lineno}: backlight must be 1-{num_buttons}")
+            if action not in COLOR_VALUES:
+                raise ValueError(f"Line {lineno}: color must be one of {', '.join(COLOR_VALUES)}")
+
+        rules.setdefault((button, gesture), []).append((channel, number, action))
+    return rules
@@ -1,31 +1,60 @@
 """Sensor platform for iPano Plus."""
 import logging
-from homeassistant.components.sensor import SensorEntity
+from datetime import timedelta
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
+import homeassistant.util.dt as dt_util
 
-from .const import DOMAIN, SIGNAL_BACKLIGHT_UPDATE
+from .const import (
+    DOMAIN,
+    LATENCY_KINDS,
+    NUM_BUTTONS,
+    SIGNAL_ACTIVITY_UPDATE,
+    SIGNAL_BACKLIGHT_UPDATE,
+    SIGNAL_RESYNC,
+    SIGNAL_RULE_EXECUTED,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Only the latency and activity sensors poll; they read the bridge aggregates once a minute
+# (activity sensors are also pushed on every change and rollover)
+SCAN_INTERVAL = timedelta(seconds=60)
+
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
     """Set up iPano Plus sensors from config entry."""
     _LOGGER.debug("Setting up iPano sensors")
-    sensors = [
-        iPanoBacklightSensor(config_entry, "Backlight 1", 1),
-        iPanoBacklightSensor(config_entry, "Backlight 2", 2),
-        iPanoBacklightSensor(config_entry, "Backlight 3", 3),
-        iPanoBacklightSensor(config_entry, "Backlight 4", 4),
-    ]
+    bridge = hass.data.get(DOMAIN, {}).get(config_entry.entry_id)
+    num_buttons = bridge.num_buttons if bridge else NUM_BUTTONS
+
+    # One backlight per button of this panel model
+    sensors = [iPanoBacklightSensor(config_entry, f"Backlight {num}", num) for num in range(1, num_buttons + 1)]
+    sensors.append(iPanoDriftSensor(config_entry))
+    sensors.extend(iPanoLatencySensor(config_entry, kind) for kind in LATENCY_KINDS)
+
+    # Activity aggregates kept by the bridge, ready for long-term statistics
+    sensors.append(iPanoOccupancySensor(config_entry, "hour"))
+    sensors.append(iPanoOccupancySensor(config_entry, "day"))
+    sensors.extend(iPanoPressCountSensor(config_entry, num) for num in range(1, num_buttons + 1))
+    sensors.append(iPanoLastActivitySensor(config_entry))
+
+    # Rule latency is only interesting when local rules are configured
+    if bridge and getattr(bridge, "local_rules", None):
+        sensors.append(iPanoRuleLatencySensor(config_entry))
+
     async_add_entities(sensors)
 
 
 class iPanoBacklightSensor(SensorEntity):
     """Representation of iPano button backlight."""
 
+    _attr_should_poll = False
+
     def __init__(self, config_entry, name, button_num):
         self._config_entry = config_entry
         self._attr_name = f"iPano {name}"
@@ -36,17 +65,18 @@ class iPanoBacklightSensor(SensorEntity):
 
     @property
     def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
         return {
             "identifiers": {("ipano", self._config_entry.entry_id)},
             "name": self._config_entry.data.get("name", "iPano Plus"),
             "manufacturer": "iPano",
-            "model": "Plus 6-inch",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
         }
 
     async def async_added_to_hass(self) -> None:
         """Register dispatcher for backlight updates."""
         self._dispatcher_unsub = async_dispatcher_connect(
-            self.hass, SIGNAL_BACKLIGHT_UPDATE, self._handle_backlight_update
+            self.hass, f"{SIGNAL_BACKLIGHT_UPDATE}_{self._config_entry.entry_id}", self._handle_backlight_update
         )
 
         bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
@@ -54,11 +84,278 @@ class iPanoBacklightSensor(SensorEntity):
             self._attr_native_value = bridge.backlight_states.get(self._button_num - 1, 0)
 
     @callback
-    def _handle_backlight_update(self, backlight_states):
+    def _handle_backlight_update(self, backlight_states, received=None):
         val = backlight_states.get(self._button_num - 1, 0)
-        self._attr_native_value = val
+        # The panel broadcasts all backlights at once; only write our own changes
+        if self._attr_native_value != val:
+            self._attr_native_value = val
+            self.async_write_ha_state()
+            bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+            if bridge:
+                bridge.record_latency("backlight", received)
+
+    async def async_will_remove_from_hass(self):
+        if self._dispatcher_unsub:
+            self._dispatcher_unsub()
+
+
+class iPanoDriftSensor(SensorEntity):
+    """Number of channels found out of sync by background resyncs."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_should_poll = False
+
+    def __init__(self, config_entry):
+        self._config_entry = config_entry
+        self._attr_name = "iPano State Drift"
+        self._attr_unique_id = f"{config_entry.entry_id}_drift_events"
+        self._attr_native_value = 0
+        self._dispatcher_unsub = None
+
+    @property
+    def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        return {
+            "identifiers": {("ipano", self._config_entry.entry_id)},
+            "name": self._config_entry.data.get("name", "iPano Plus"),
+            "manufacturer": "iPano",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Register dispatcher for resync results of this entry."""
+        self._dispatcher_unsub = async_dispatcher_connect(
+            self.hass, f"{SIGNAL_RESYNC}_{self._config_entry.entry_id}", self._handle_resync
+        )
+        self._update_from_bridge()
+
+    def _update_from_bridge(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if bridge and hasattr(bridge, "drift_events"):
+            self._attr_native_value = bridge.drift_events
+
+    @callback
+    def _handle_resync(self, drifted):
+        # Only write when something drifted; clean resyncs do not touch the recorder
+        if not drifted:
+            return
+        self._update_from_bridge()
         self.async_write_ha_state()
 
     async def async_will_remove_from_hass(self):
         if self._dispatcher_unsub:
             self._dispatcher_unsub()
+
+
+class iPanoRuleLatencySensor(SensorEntity):
+    """Execution latency of the last local button rule."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 3
+    _attr_should_poll = False
+    _unrecorded_attributes = frozenset({"executions", "max_ms"})
+
+    def __init__(self, config_entry):
+        self._config_entry = config_entry
+        self._attr_name = "iPano Local Rule Latency"
+        self._attr_unique_id = f"{config_entry.entry_id}_rule_latency"
+        self._attr_native_value = None
+        self._dispatcher_unsub = None
+
+    @property
+    def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        return {
+            "identifiers": {("ipano", self._config_entry.entry_id)},
+            "name": self._config_entry.data.get("name", "iPano Plus"),
+            "manufacturer": "iPano",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Register dispatcher for rule executions of this entry."""
+        self._dispatcher_unsub = async_dispatcher_connect(
+            self.hass, f"{SIGNAL_RULE_EXECUTED}_{self._config_entry.entry_id}", self._handle_rule_executed
+        )
+
+    @callback
+    def _handle_rule_executed(self, latency):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        self._attr_native_value = round(latency, 3)
+        if bridge:
+            self._attr_extra_state_attributes = {
+                "executions": bridge.rule_executions,
+                "max_ms": round(bridge.rule_latency_max, 3),
+            }
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self):
+        if self._dispatcher_unsub:
+            self._dispatcher_unsub()
+
+
+class iPanoLatencySensor(SensorEntity):
+    """Mean time from reading a frame to an entity writing its state.
+
+    Reports the mean over the frames seen since the previous poll and keeps
+    the last value when no frames of this kind arrived.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 3
+    _unrecorded_attributes = frozenset({"count", "max_ms", "buckets"})
+
+    def __init__(self, config_entry, kind):
+        self._config_entry = config_entry
+        self._kind = kind
+        self._attr_name = f"iPano {kind.capitalize()} Latency"
+        self._attr_unique_id = f"{config_entry.entry_id}_{kind}_latency"
+        self._attr_native_value = None
+        self._seen = (0, 0.0)
+
+    @property
+    def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        return {
+            "identifiers": {("ipano", self._config_entry.entry_id)},
+            "name": self._config_entry.data.get("name", "iPano Plus"),
+            "manufacturer": "iPano",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
+        }
+
+    async def async_update(self) -> None:
+        """Summarise the samples recorded since the last poll."""
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if not bridge:
+            return
+        histogram = bridge.latency[self._kind]
+        count, total = self._seen
+        if histogram.count > count:
+            self._attr_native_value = round((histogram.total - total) / (histogram.count - count), 3)
+        self._seen = (histogram.count, histogram.total)
+        stats = histogram.as_dict()
+        self._attr_extra_state_attributes = {
+            "count": stats["count"],
+            "max_ms": stats["max_ms"],
+            "buckets": stats["buckets"],
+        }
+
+
+class iPanoActivitySensor(SensorEntity):
+    """Base for the sensors that read the bridge activity aggregates.
+
+    Polled once a minute, and pushed by the bridge only at each bucket
+    rollover, so the closing value of every hour and day is recorded without
+    a state write per press.
+    """
+
+    def __init__(self, config_entry):
+        self._config_entry = config_entry
+        self._dispatcher_unsub = None
+
+    async def async_added_to_hass(self) -> None:
+        """Register dispatcher callback for activity updates."""
+        self._dispatcher_unsub = async_dispatcher_connect(
+            self.hass, f"{SIGNAL_ACTIVITY_UPDATE}_{self._config_entry.entry_id}", self._handle_activity_update
+        )
+
+    def _read(self, activity) -> None:
+        """Copy the values of this sensor from the aggregates."""
+        raise NotImplementedError
+
+    @callback
+    def _handle_activity_update(self):
+        """Write the state if the pushed aggregates changed it."""
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if not bridge:
+            return
+        before = (self.native_value, self.last_reset)
+        self._read(bridge.activity)
+        if (self.native_value, self.last_reset) != before:
+            self.async_write_ha_state()
+
+    async def async_update(self) -> None:
+        """Read the aggregates, with occupancy accrued up to now."""
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if not bridge:
+            return
+        # Only accrues within the current hour; the bridge rolls the buckets
+        bridge.activity.accrue(dt_util.utcnow())
+        self._read(bridge.activity)
+
+    @property
+    def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        return {
+            "identifiers": {("ipano", self._config_entry.entry_id)},
+            "name": self._config_entry.data.get("name", "iPano Plus"),
+            "manufacturer": "iPano",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
+        }
+
+    async def async_will_remove_from_hass(self):
+        if self._dispatcher_unsub:
+            self._dispatcher_unsub()
+
+
+class iPanoOccupancySensor(iPanoActivitySensor):
+    """Seconds someone was in front of the panel during the current hour or day."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.TOTAL
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_display_precision = 0
+
+    def __init__(self, config_entry, period):
+        super().__init__(config_entry)
+        self._period = period
+        self._attr_name = "iPano Occupancy This Hour" if period == "hour" else "iPano Occupancy Today"
+        self._attr_unique_id = f"{config_entry.entry_id}_occupancy_{period}"
+        self._attr_native_value = 0.0
+
+    def _read(self, activity) -> None:
+        if self._period == "hour":
+            self._attr_native_value = round(activity.occupancy_hour, 1)
+            self._attr_last_reset = activity.hour_start
+        else:
+            self._attr_native_value = round(activity.occupancy_day, 1)
+            self._attr_last_reset = activity.day_start
+
+
+class iPanoPressCountSensor(iPanoActivitySensor):
+    """Presses of one button during the current hour."""
+
+    _attr_state_class = SensorStateClass.TOTAL
+    _attr_native_unit_of_measurement = "presses"
+
+    def __init__(self, config_entry, button_num):
+        super().__init__(config_entry)
+        self._button_num = button_num
+        self._attr_name = f"iPano Button {button_num} Presses This Hour"
+        self._attr_unique_id = f"{config_entry.entry_id}_presses_{button_num}"
+        self._attr_native_value = 0
+
+    def _read(self, activity) -> None:
+        self._attr_native_value = activity.presses_hour.get(self._button_num, 0)
+        self._attr_last_reset = activity.hour_start
+        self._attr_extra_state_attributes = {"today": activity.presses_day.get(self._button_num, 0)}
+
+
+class iPanoLastActivitySensor(iPanoActivitySensor):
+    """When someone last pressed a button or was detected by the panel."""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    def __init__(self, config_entry):
+        super().__init__(config_entry)
+        self._attr_name = "iPano Last Activity"
+        self._attr_unique_id = f"{config_entry.entry_id}_last_activity"
+        self._attr_native_value = None
+
+    def _read(self, activity) -> None:
+        self._attr_native_value = activity.last_activity
@@ -3,10 +3,12 @@ import logging
 import asyncio
 import voluptuous as vol
 
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
 from homeassistant.helpers import config_validation as cv
 
-from .const import DOMAIN
+from .const import DOMAIN, MAX_BUTTONS, MAX_RELAYS
+from .fleet import get_fleet
+from .profiler import iPanoProfiler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,16 +19,21 @@ SERVICE_PULSE_BACKLIGHT = "pulse_backlight"
 SERVICE_FADE_BACKLIGHT = "fade_backlight"
 SERVICE_BREATHING_BACKLIGHT = "breathing_backlight"
 SERVICE_CONTROL_RELAY = "control_relay"
+SERVICE_FLEET_STATUS = "fleet_status"
+SERVICE_SET_PROXIMITY = "set_proximity"
+SERVICE_START_APPLICATION = "start_application"
+SERVICE_APPLY_SCENE = "apply_scene"
+SERVICE_PROFILE = "profile"
 
 SERVICE_SCHEMA_SET_BACKLIGHT = vol.Schema(
-    {vol.Required("button"): vol.All(vol.Coerce(int), vol.Range(min=1, max=4)), vol.Required("color"): vol.In(["off", "white", "yellow"])}
+    {vol.Required("button"): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_BUTTONS)), vol.Required("color"): vol.In(["off", "white", "yellow"])}
 )
 
 SERVICE_SCHEMA_SET_ALL_BACKLIGHTS = vol.Schema({vol.Required("color"): vol.In(["off", "white", "yellow"])})
 SERVICE_SCHEMA_WAKE_SCREEN = vol.Schema({})
 SERVICE_SCHEMA_PULSE_BACKLIGHT = vol.Schema(
     {
-        vol.Required("button"): vol.All(vol.Coerce(int), vol.Range(min=1, max=4)),
+        vol.Required("button"): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_BUTTONS)),
         vol.Optional("color", default="white"): vol.In(["white", "yellow"]),
         vol.Optional("times", default=1): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
         vol.Optional("duration", default=0.5): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=5.0)),
@@ -34,7 +41,7 @@ SERVICE_SCHEMA_PULSE_BACKLIGHT = vol.Schema(
 )
 SERVICE_SCHEMA_FADE_BACKLIGHT = vol.Schema(
     {
-        vol.Required("button"): vol.All(vol.Coerce(int), vol.Range(min=1, max=4)),
+        vol.Required("button"): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_BUTTONS)),
         vol.Optional("from_color", default="white"): vol.In(["white", "yellow"]),
         vol.Optional("to_color", default="off"): vol.In(["off", "white", "yellow"]),
         vol.Optional("duration", default=2.0): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=10.0)),
@@ -42,13 +49,38 @@ SERVICE_SCHEMA_FADE_BACKLIGHT = vol.Schema(
 )
 SERVICE_SCHEMA_BREATHING_BACKLIGHT = vol.Schema(
     {
-        vol.Required("button"): vol.All(vol.Coerce(int), vol.Range(min=1, max=4)),
+        vol.Required("button"): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_BUTTONS)),
         vol.Optional("color", default="white"): vol.In(["white", "yellow"]),
         vol.Optional("cycles", default=3): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
         vol.Optional("breath_duration", default=4.0): vol.All(vol.Coerce(float), vol.Range(min=1.0, max=10.0)),
     }
 )
-SERVICE_SCHEMA_CONTROL_RELAY = vol.Schema({vol.Required("relay"): vol.All(vol.Coerce(int), vol.Range(min=1, max=6)), vol.Required("state"): vol.In(["on", "off"])})
+SERVICE_SCHEMA_CONTROL_RELAY = vol.Schema({vol.Required("relay"): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_RELAYS)), vol.Required("state"): vol.In(["on", "off"])})
+SERVICE_SCHEMA_FLEET_STATUS = vol.Schema({})
+SERVICE_SCHEMA_PROFILE = vol.Schema(
+    {
+        vol.Optional("panels"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("duration", default=30): vol.All(vol.Coerce(int), vol.Range(min=1, max=600)),
+        vol.Optional("memory", default=False): cv.boolean,
+    }
+)
+SERVICE_SCHEMA_SET_PROXIMITY = vol.Schema(
+    {
+        vol.Required("enabled"): cv.boolean,
+        vol.Optional("distance"): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    }
+)
+SERVICE_SCHEMA_START_APPLICATION = vol.Schema({vol.Required("package"): cv.string})
+SERVICE_SCHEMA_APPLY_SCENE = vol.Schema(
+    {
+        vol.Optional("panels"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("relays", default={}): {vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_RELAYS)): cv.boolean},
+        vol.Optional("backlights", default={}): {
+            vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_BUTTONS)): vol.In(["off", "white", "yellow", "both"])
+        },
+        vol.Optional("timeout", default=3.0): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=30.0)),
+    }
+)
 
 
 async def async_setup_services(hass: HomeAssistant):
@@ -152,6 +184,91 @@ async def async_setup_services(hass: HomeAssistant):
             if hasattr(bridge, "async_control_relay"):
                 await bridge.async_control_relay(relay, state == "on")
 
+    async def handle_set_proximity(call: ServiceCall):
+        enabled = call.data.get("enabled")
+        distance = call.data.get("distance")
+        _LOGGER.info(f"Set proximity: enabled={enabled}, distance={distance}")
+        if DOMAIN not in hass.data or not hass.data[DOMAIN]:
+            _LOGGER.error("No iPano Plus devices configured")
+            return
+        for entry_id, bridge in hass.data[DOMAIN].items():
+            if hasattr(bridge, "async_set_proximity"):
+                await bridge.async_set_proximity(enabled, distance)
+
+    async def handle_start_application(call: ServiceCall):
+        package = call.data.get("package")
+        _LOGGER.info(f"Start application {package}")
+        if DOMAIN not in hass.data or not hass.data[DOMAIN]:
+            _LOGGER.error("No iPano Plus devices configured")
+            return
+        for entry_id, bridge in hass.data[DOMAIN].items():
+            if hasattr(bridge, "async_start_application"):
+                await bridge.async_start_application(package)
+
+    async def handle_apply_scene(call: ServiceCall):
+        panels = call.data.get("panels")
+        relays = call.data.get("relays", {})
+        backlights = call.data.get("backlights", {})
+        timeout = call.data.get("timeout", 3.0)
+        _LOGGER.debug(f"Apply scene: panels={panels}, relays={relays}, backlights={backlights}")
+        if DOMAIN not in hass.data or not hass.data[DOMAIN]:
+            _LOGGER.error("No iPano Plus devices configured")
+            return {}
+
+        bridges = {
+            entry_id: bridge
+            for entry_id, bridge in hass.data[DOMAIN].items()
+            if hasattr(bridge, "async_apply_scene") and (not panels or entry_id in panels or bridge.name in panels)
+        }
+        # Panels are written concurrently; each gets a single batched write
+        results = await asyncio.gather(
+            *(bridge.async_apply_scene(relays, backlights, timeout) for bridge in bridges.values())
+        )
+        return {
+            bridge.name: result for bridge, result in zip(bridges.values(), results)
+        }
+
+    async def handle_profile(call: ServiceCall):
+        panels = call.data.get("panels")
+        duration = call.data.get("duration", 30)
+        memory = call.data.get("memory", False)
+        if hass.data[DOMAIN].get("_profiling"):
+            _LOGGER.error("An iPano profile run is already in progress")
+            return {}
+
+        bridges = [
+            bridge
+            for entry_id, bridge in hass.data.get(DOMAIN, {}).items()
+            if hasattr(bridge, "_process_message") and (not panels or entry_id in panels or bridge.name in panels)
+        ]
+        if not bridges:
+            _LOGGER.error("No iPano Plus devices configured")
+            return {}
+
+        _LOGGER.info(f"Profiling {len(bridges)} iPano panel(s) for {duration}s (memory={memory})")
+        hass.data[DOMAIN]["_profiling"] = True
+        try:
+            return await iPanoProfiler(hass, bridges, duration, memory).async_run()
+        except RuntimeError as err:
+            _LOGGER.error(f"Cannot profile iPano panels: {err}")
+            return {}
+        finally:
+            hass.data[DOMAIN].pop("_profiling", None)
+
+    async def handle_fleet_status(call: ServiceCall):
+        bridges = {
+            entry_id: bridge
+            for entry_id, bridge in hass.data.get(DOMAIN, {}).items()
+            if hasattr(bridge, "async_get_connection_status")
+        }
+        fleet = get_fleet(hass)
+        return {
+            "panels": len(bridges),
+            "connected": sum(1 for bridge in bridges.values() if bridge.connected),
+            "disconnected": sorted(bridge.name for bridge in bridges.values() if not bridge.connected),
+            "fleet": fleet.async_get_status() if fleet else None,
+        }
+
     hass.services.async_register(DOMAIN, SERVICE_WAKE_SCREEN, handle_wake_screen, SERVICE_SCHEMA_WAKE_SCREEN)
     hass.services.async_register(DOMAIN, SERVICE_SET_BACKLIGHT, handle_set_backlight, SERVICE_SCHEMA_SET_BACKLIGHT)
     hass.services.async_register(DOMAIN, SERVICE_SET_ALL_BACKLIGHTS, handle_set_all_backlights, SERVICE_SCHEMA_SET_ALL_BACKLIGHTS)
@@ -160,4 +277,16 @@ async def async_setup_services(hass: HomeAssistant):
     hass.services.async_register(DOMAIN, SERVICE_BREATHING_BACKLIGHT, handle_breathing_backlight, SERVICE_SCHEMA_BREATHING_BACKLIGHT)
     hass.services.async_register(DOMAIN, SERVICE_CONTROL_RELAY, handle_control_relay, SERVICE_SCHEMA_CONTROL_RELAY)
 
+    hass.services.async_register(DOMAIN, SERVICE_SET_PROXIMITY, handle_set_proximity, SERVICE_SCHEMA_SET_PROXIMITY)
+    hass.services.async_register(DOMAIN, SERVICE_START_APPLICATION, handle_start_application, SERVICE_SCHEMA_START_APPLICATION)
+    hass.services.async_register(
+        DOMAIN, SERVICE_APPLY_SCENE, handle_apply_scene, SERVICE_SCHEMA_APPLY_SCENE, supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, handle_profile, SERVICE_SCHEMA_PROFILE, supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_FLEET_STATUS, handle_fleet_status, SERVICE_SCHEMA_FLEET_STATUS, supports_response=SupportsResponse.ONLY
+    )
+
     _LOGGER.info("iPano Plus services registered")
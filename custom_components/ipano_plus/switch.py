@@ -6,7 +6,7 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN, SIGNAL_RELAY_UPDATE
+from .const import DOMAIN, NUM_RELAYS, SIGNAL_RELAY_UPDATE
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,10 +18,10 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, asyn
     # Try to get the bridge for live state
     bridge = hass.data.get(DOMAIN, {}).get(config_entry.entry_id)
 
-    switches = [
-        iPanoRelaySwitch(config_entry, bridge, "Relay 1", 1),
-        iPanoRelaySwitch(config_entry, bridge, "Relay 2", 2),
-    ]
+    num_relays = bridge.num_relays if bridge else NUM_RELAYS
+
+    # One switch per relay of this panel model
+    switches = [iPanoRelaySwitch(config_entry, bridge, f"Relay {num}", num) for num in range(1, num_relays + 1)]
 
     async_add_entities(switches)
 
@@ -43,7 +43,7 @@ class iPanoRelaySwitch(SwitchEntity):
     async def async_added_to_hass(self) -> None:
         """Register dispatcher for relay updates."""
         self._dispatcher_unsub = async_dispatcher_connect(
-            self.hass, SIGNAL_RELAY_UPDATE, self._handle_relay_update
+            self.hass, f"{SIGNAL_RELAY_UPDATE}_{self._config_entry.entry_id}", self._handle_relay_update
         )
 
         # initialize from bridge
@@ -53,20 +53,23 @@ class iPanoRelaySwitch(SwitchEntity):
             _LOGGER.debug(f"Initial state for relay {self._relay_num}: {self._attr_is_on}")
 
     @callback
-    def _handle_relay_update(self, relay_states):
+    def _handle_relay_update(self, relay_states, received=None):
         val = relay_states.get(self._bridge_relay_index, False)
         if self._attr_is_on != val:
             self._attr_is_on = val
             self.async_write_ha_state()
+            if self._bridge:
+                self._bridge.record_latency("relay", received)
             _LOGGER.debug(f"Relay {self._relay_num} updated to {self._attr_is_on}")
 
     @property
     def device_info(self):
+        bridge = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
         return {
             "identifiers": {("ipano", self._config_entry.entry_id)},
             "name": self._config_entry.data.get("name", "iPano Plus"),
             "manufacturer": "iPano",
-            "model": "Plus 6-inch",
+            "model": bridge.model["name"] if bridge else "Plus 6-inch",
         }
 
     @property
@@ -0,0 +1,178 @@
+"""Websocket API streaming live panel activity to frontends.
+
+``ipano_plus/subscribe`` connects a subscription straight to the bridges'
+dispatcher signals. Nothing goes through the event bus or the state
+machine, so a dashboard watching many panels costs only the subscribers.
+"""
+import logging
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import (
+    DOMAIN,
+    LATENCY_KINDS,
+    SIGNAL_BACKLIGHT_UPDATE,
+    SIGNAL_BUTTON_EVENT,
+    SIGNAL_PROXIMITY_UPDATE,
+    SIGNAL_RELAY_UPDATE,
+    WS_BATCH_INTERVAL,
+    WS_QUEUE_SIZE,
+    WS_TYPE_SUBSCRIBE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+CHANNEL_SIGNALS = {
+    "button": SIGNAL_BUTTON_EVENT,
+    "relay": SIGNAL_RELAY_UPDATE,
+    "backlight": SIGNAL_BACKLIGHT_UPDATE,
+    "proximity": SIGNAL_PROXIMITY_UPDATE,
+}
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+class iPanoEventStream:
+    """Batches the events of one subscription.
+
+    Button events are queued in order, up to ``WS_QUEUE_SIZE``; the oldest
+    are dropped (and counted) when a client cannot keep up. State channels
+    only keep their latest value per panel, so they never queue. Everything
+    queued is sent as one message every ``WS_BATCH_INTERVAL`` at most.
+    """
+
+    def __init__(self, hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg_id: int):
+        """Initialize an empty stream."""
+        self.hass = hass
+        self.connection = connection
+        self.msg_id = msg_id
+        self.dropped = 0
+        self._buttons: deque = deque(maxlen=WS_QUEUE_SIZE)
+        self._states: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._unsubs: List = []
+        self._flush_handle = None
+
+    @callback
+    def async_subscribe(self, entry_id: str, channel: str) -> None:
+        """Follow one channel of one panel."""
+        signal = f"{CHANNEL_SIGNALS[channel]}_{entry_id}"
+        if channel == "button":
+
+            @callback
+            def _handle(payload):
+                self.queue_button(entry_id, payload)
+
+        else:
+
+            @callback
+            def _handle(state, received=None):
+                self.queue_state(entry_id, channel, state)
+
+        self._unsubs.append(async_dispatcher_connect(self.hass, signal, _handle))
+
+    @callback
+    def queue_button(self, entry_id: str, payload: Dict[str, Any]) -> None:
+        """Queue a button event."""
+        if len(self._buttons) == WS_QUEUE_SIZE:
+            self.dropped += 1
+        self._buttons.append(
+            {
+                "entry": entry_id,
+                "channel": "button",
+                "button": payload.get("button"),
+                "action": payload.get("action"),
+                "repeat": payload.get("repeat_count", 0),
+            }
+        )
+        self._schedule()
+
+    @callback
+    def queue_state(self, entry_id: str, channel: str, state: Any) -> None:
+        """Replace the pending state of a channel."""
+        # Relay and backlight states become lists in channel order (index 0 = channel 1);
+        # this also copies them, as the bridge keeps updating its own dicts
+        if isinstance(state, dict):
+            state = list(state.values())
+        self._states[(entry_id, channel)] = {"entry": entry_id, "channel": channel, "state": state}
+        self._schedule()
+
+    @callback
+    def _schedule(self) -> None:
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_later(WS_BATCH_INTERVAL, self.flush)
+
+    @callback
+    def flush(self) -> None:
+        """Send everything queued as one event message."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buttons and not self._states:
+            return
+
+        events = list(self._buttons)
+        events.extend(self._states.values())
+        self._buttons.clear()
+        self._states.clear()
+        self.connection.send_message(
+            websocket_api.event_message(self.msg_id, {"events": events, "dropped": self.dropped})
+        )
+
+    @callback
+    def async_close(self) -> None:
+        """Stop following the panels."""
+        while self._unsubs:
+            self._unsubs.pop()()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_TYPE_SUBSCRIBE,
+        vol.Optional("entry_ids"): [str],
+        vol.Optional("channels", default=list(LATENCY_KINDS)): [vol.In(LATENCY_KINDS)],
+    }
+)
+@callback
+def ws_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]) -> None:
+    """Stream live button, relay, backlight and proximity events."""
+    entry_ids = msg.get("entry_ids")
+    channels = msg["channels"]
+    bridges = {
+        entry_id: bridge
+        for entry_id, bridge in hass.data.get(DOMAIN, {}).items()
+        if hasattr(bridge, "relay_states") and (not entry_ids or entry_id in entry_ids)
+    }
+    if not bridges:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "No matching iPano Plus panels")
+        return
+
+    stream = iPanoEventStream(hass, connection, msg["id"])
+    for entry_id in bridges:
+        for channel in channels:
+            stream.async_subscribe(entry_id, channel)
+    connection.subscriptions[msg["id"]] = stream.async_close
+    connection.send_result(msg["id"])
+
+    # Start the client off with the current state of every followed channel
+    for entry_id, bridge in bridges.items():
+        if "relay" in channels:
+            stream.queue_state(entry_id, "relay", bridge.relay_states)
+        if "backlight" in channels:
+            stream.queue_state(entry_id, "backlight", bridge.backlight_states)
+        if "proximity" in channels:
+            stream.queue_state(entry_id, "proximity", bridge.proximity_state)
+    stream.flush()
+    _LOGGER.debug(f"Websocket subscription {msg['id']} follows {len(bridges)} panel(s): {', '.join(channels)}")
@@ -0,0 +1,129 @@
+"""Microbenchmark of outbound command encoding.
+
+1. Encoding only: ``json.dumps`` + ``encode`` of a fresh message dict, as
+   every send did before the frame table, against ``encode_messages`` on
+   the cached ``iPanoFrame`` of the same command.
+2. Send path: ``async_set_backlight``, ``async_control_relay``,
+   ``async_wake_screen`` and a relay query write on a connected bridge
+   whose transport discards the bytes. Pass the root of another checkout
+   (e.g. a ``git worktree`` of the commit before the frame table) to
+   compare.
+
+Usage (needs Home Assistant installed)::
+
+    python tests/bench_frames.py [repo root]
+"""
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), ".."))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+DOMAIN = "ipano_plus"
+CALLS = 20000
+REPEATS = 5
+COLORS = ("off", "white", "yellow", "both")
+
+
+class DiscardTransport:
+    """Transport that only counts the bytes written."""
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, data: bytes) -> None:
+        self.written += len(data)
+
+    def is_closing(self) -> bool:
+        return False
+
+
+class IdleProtocol:
+    """Protocol that never pauses writing."""
+
+    async def drain(self) -> None:
+        return None
+
+
+def best_of(func) -> float:
+    """Return the best time per call in microseconds."""
+    return min(timeit.repeat(func, number=CALLS, repeat=REPEATS)) / CALLS * 1e6
+
+
+def bench_encoding() -> None:
+    try:
+        frames = importlib.import_module(f"custom_components.{DOMAIN}.frames")
+    except ImportError:
+        print("encoding: this tree has no frame table")
+        return
+    const = importlib.import_module(f"custom_components.{DOMAIN}.const")
+    table = frames.build_frame_table(4, 2)
+    key = (const.MSG_TYPE_BACKLIGHT_CONTROL, 2, 1)
+    batch_keys = [(const.MSG_TYPE_RELAY_CONTROL, 0, True), key, (const.MSG_TYPE_BACKLIGHT_CONTROL, 3, 2)]
+
+    def plain(msg_type, num, val):
+        return {"type": msg_type, "data": {"num": num, "val": val}}
+
+    results = {
+        "json.dumps, one command": best_of(lambda: (json.dumps(plain(*key)) + "\n").encode()),
+        "cached frame, one command": best_of(lambda: frames.encode_messages([table[key]])),
+        "json.dumps, batch of 3": best_of(
+            lambda: "".join(json.dumps(plain(*k)) + "\n" for k in batch_keys).encode()
+        ),
+        "cached frames, batch of 3": best_of(lambda: frames.encode_messages([table[k] for k in batch_keys])),
+    }
+    assert frames.encode_messages([table[key]]) == (json.dumps(plain(*key)) + "\n").encode()
+    for name, micros in results.items():
+        print(f"{name:28s} {micros:6.2f} us")
+
+
+async def bench_send_path() -> None:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    bridge_module = importlib.import_module(f"custom_components.{DOMAIN}.bridge")
+    bridge = bridge_module.iPanoBridge(hass, {"host": "127.0.0.1", "name": "bench", "model": "plus_6"}, entry_id="bench")
+    bridge.connected = True
+    bridge.transport = DiscardTransport()
+    bridge.protocol = IdleProtocol()
+
+    async def set_backlight(i):
+        await bridge.async_set_backlight(str(i % 4 + 1), COLORS[i % 4])
+
+    async def control_relay(i):
+        await bridge.async_control_relay(i % 2 + 1, i % 3 == 0)
+
+    async def wake_screen(i):
+        await bridge.async_wake_screen()
+
+    async def relay_query(i):
+        frame = getattr(bridge, "_frame", None)
+        bridge._write_message(frame(52) if frame else {"type": 52})
+
+    for name, func in (
+        ("set_backlight", set_backlight),
+        ("control_relay", control_relay),
+        ("wake_screen", wake_screen),
+        ("relay query write", relay_query),
+    ):
+        best = float("inf")
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            for i in range(CALLS):
+                await func(i)
+            best = min(best, time.perf_counter() - started)
+        print(f"{name:28s} {best / CALLS * 1e6:6.2f} us/call")
+    print(f"bytes written: {bridge.transport.written}")
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    bench_encoding()
+    asyncio.run(bench_send_path())
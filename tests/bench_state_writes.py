@@ -0,0 +1,113 @@
+"""Count entity state writes per 1,000 panel frames.
+
+Sets up every platform of the integration for one bridge (no panel
+connection), replaces ``async_write_ha_state`` with a counter and feeds a
+fixed, realistic frame mix through ``iPanoBridge._process_message``:
+
+- a button press with three auto-repeats and a release,
+- two identical backlight broadcasts in which one button changed,
+- a relay broadcast in which one relay changed,
+- two identical proximity frames.
+
+Writes are reported per entity class, in total, and without the entities
+that are disabled by default on new installations.
+
+Usage (needs Home Assistant installed)::
+
+    python tests/bench_state_writes.py [repo root]
+
+Pass the root of another checkout (e.g. a ``git worktree`` of an older
+commit) to compare before and after.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), ".."))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+DOMAIN = "ipano_plus"
+PLATFORMS = ["sensor", "binary_sensor", "switch", "event"]
+FRAMES = 1000
+KEYCODES = (131, 132, 133, 134)
+
+
+def frame_mix(count: int):
+    """Return the benchmark frames."""
+    frames = []
+    backlights = [0, 0, 0, 0]
+    relays = [False, False]
+    cycle = 0
+    while len(frames) < count:
+        keycode = KEYCODES[cycle % 4]
+        for repeat in range(4):
+            frames.append({"type": 0, "data": {"keyCode": keycode, "action": 0, "repeatCount": repeat}})
+        frames.append({"type": 0, "data": {"keyCode": keycode, "action": 1, "repeatCount": 0}})
+
+        backlights[cycle % 4] = (backlights[cycle % 4] + 1) % 3
+        for _ in range(2):
+            frames.append({"type": 10, "data": [{"num": num, "val": val} for num, val in enumerate(backlights)]})
+
+        relays[cycle % 2] = not relays[cycle % 2]
+        frames.append({"type": 50, "data": [{"num": num, "val": val} for num, val in enumerate(relays)]})
+
+        for _ in range(2):
+            frames.append({"type": 60, "data": cycle % 3 == 0})
+        cycle += 1
+    return [json.dumps(frame) for frame in frames[:count]]
+
+
+async def run() -> None:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    bridge_module = importlib.import_module(f"custom_components.{DOMAIN}.bridge")
+    entry = SimpleNamespace(entry_id="bench", data={"name": "bench"}, options={})
+    bridge = bridge_module.iPanoBridge(hass, {"host": "127.0.0.1", "model": "plus_6"}, entry_id="bench")
+    hass.data[DOMAIN] = {"bench": bridge}
+
+    entities = []
+    for platform in PLATFORMS:
+        try:
+            module = importlib.import_module(f"custom_components.{DOMAIN}.{platform}")
+        except ImportError:
+            # Older trees do not have every platform
+            continue
+        await module.async_setup_entry(hass, entry, lambda new, *args, **kwargs: entities.extend(new))
+
+    writes = {}
+    enabled = set()
+    for index, entity in enumerate(entities):
+        key = type(entity).__name__
+        writes[key] = 0
+        if entity.entity_registry_enabled_default:
+            enabled.add(key)
+        entity.hass = hass
+        entity.entity_id = f"{DOMAIN}.bench_{index}"
+
+        def count(*args, key=key):
+            writes[key] += 1
+
+        entity.async_write_ha_state = count
+        entity.schedule_update_ha_state = count
+        await entity.async_added_to_hass()
+    writes = dict.fromkeys(writes, 0)
+
+    for frame in frame_mix(FRAMES):
+        bridge._process_message(frame)
+    await asyncio.sleep(0)
+
+    for key, value in sorted(writes.items()):
+        print(f"{key:32s} {value:5d}{'' if key in enabled else '  (disabled by default)'}")
+    print(f"state writes per {FRAMES} frames: {sum(writes.values())}")
+    print(f"without entities disabled by default: {sum(value for key, value in writes.items() if key in enabled)}")
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(run())
@@ -0,0 +1,269 @@
+"""Soak test of the iPano bridge connection lifecycle.
+
+Runs ``iPanoBridge`` against a fake panel on an event loop with a virtual
+clock: whenever the selector has nothing to do, time jumps ahead to the
+next timer, so hours of heartbeats, reconnect back-off and resyncs pass in
+seconds. It first checks that a panel flapping during startup leaves a
+single link. Then the panel drops the link a few thousand times, with
+button storms and relay, backlight and scene calls in between, and the
+test checks that tasks, file descriptors, memory and the bridge's waiter
+lists stay flat.
+
+Usage (needs Home Assistant installed)::
+
+    python tests/soak_bridge.py [cycles]
+"""
+import asyncio
+import gc
+import json
+import logging
+import os
+import selectors
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.ipano_plus import bridge as bridge_module  # noqa: E402
+
+DEFAULT_CYCLES = 2000
+MEMORY_GROWTH_LIMIT = 256 * 1024
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Selector that advances the loop clock instead of blocking."""
+
+    loop = None
+
+    def select(self, timeout=None):
+        events = super().select(0 if timeout is None or timeout > 0 else timeout)
+        if not events:
+            # Give real sockets a moment before declaring the loop idle
+            events = super().select(0.0005)
+        if not events and timeout and timeout > 0:
+            self.loop.virtual_time += timeout
+        return events
+
+
+class VirtualLoop(asyncio.SelectorEventLoop):
+    """Event loop whose time() only moves when the loop is idle."""
+
+    def __init__(self):
+        selector = VirtualSelector()
+        selector.loop = self
+        self.virtual_time = 0.0
+        super().__init__(selector)
+
+    def time(self):
+        return self.virtual_time
+
+
+class FakePanel:
+    """Minimal panel: echoes heartbeats, answers queries and applies commands."""
+
+    def __init__(self, relays: int = 2, buttons: int = 4):
+        self.relays = [False] * relays
+        self.backlights = [0] * buttons
+        self.writers = []
+        self.server = None
+        self.port = None
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", self.port or 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        self.drop_links()
+        await self.server.wait_closed()
+
+    def drop_links(self) -> None:
+        for writer in self.writers:
+            writer.close()
+        self.writers.clear()
+
+    def send(self, message) -> None:
+        self.writers[-1].write((json.dumps(message) + "\n").encode())
+
+    def _relay_state(self):
+        return {"type": 50, "data": [{"num": num, "val": val} for num, val in enumerate(self.relays)]}
+
+    def _backlight_state(self):
+        return {"type": 10, "data": [{"num": num, "val": val} for num, val in enumerate(self.backlights)]}
+
+    async def _handle(self, reader, writer):
+        self.writers.append(writer)
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                msg_type = message.get("type")
+                replies = []
+                if msg_type == 500:
+                    replies = [message]
+                elif msg_type == 52:
+                    replies = [self._relay_state()]
+                elif msg_type == 12:
+                    replies = [self._backlight_state()]
+                elif msg_type == 62:
+                    replies = [{"type": 62, "data": {"enable": True}}]
+                elif msg_type == 51:
+                    self.relays[message["data"]["num"]] = message["data"]["val"]
+                    replies = [{"type": 50, "data": [message["data"]]}]
+                elif msg_type == 11:
+                    self.backlights[message["data"]["num"]] = message["data"]["val"]
+                    replies = [self._backlight_state()]
+                for reply in replies:
+                    writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if writer in self.writers:
+                self.writers.remove(writer)
+
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+async def wait_connected(bridge, seconds: int = 400) -> None:
+    for _ in range(seconds):
+        await asyncio.sleep(1)
+        if bridge.connected and bridge.protocol is not None:
+            return
+    raise AssertionError(f"{bridge.name} did not reconnect within {seconds}s")
+
+
+async def flapping_startup(hass) -> None:
+    """Drop the first link at once and refuse connections for 7s.
+
+    Startup and the reconnect after the drop must not end up with two live
+    links, or every frame would be handled twice.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    panel = FakePanel()
+    await panel.start()
+    bridge = bridge_module.iPanoBridge(
+        hass,
+        {"host": "127.0.0.1", "port": panel.port, "name": "flapping", "model": "plus_6"},
+        entry_id="flapping",
+    )
+    presses = []
+    unsub = hass.bus.async_listen(
+        "ipano_button_pressed",
+        lambda event: presses.append(event) if event.data["button"] != "system" else None,
+    )
+
+    async def flap():
+        await asyncio.sleep(0.5)
+        await panel.stop()
+        await asyncio.sleep(7)
+        await panel.start()
+
+    flapper = asyncio.create_task(flap())
+    try:
+        await bridge.async_start()
+        await flapper
+        await asyncio.sleep(started + 25 - loop.time())
+        assert len(panel.writers) == 1, f"{len(panel.writers)} live links after a flapping start"
+
+        panel.send({"type": 0, "data": {"keyCode": 131, "action": 0, "repeatCount": 0}})
+        await asyncio.sleep(1)
+        assert len(presses) == 1, f"one button frame gave {len(presses)} events"
+    finally:
+        unsub()
+        await bridge.async_stop()
+        await panel.stop()
+    print("OK: flapping start leaves one link")
+
+
+async def soak(cycles: int) -> None:
+    loop = asyncio.get_running_loop()
+    bridge_module.time = types.SimpleNamespace(time=loop.time, monotonic=loop.time, perf_counter=time.perf_counter)
+
+    hass = HomeAssistant(tempfile.mkdtemp())
+    await flapping_startup(hass)
+
+    panel = FakePanel()
+    await panel.start()
+    bridge = bridge_module.iPanoBridge(
+        hass,
+        {
+            "host": "127.0.0.1",
+            "port": panel.port,
+            "name": "soak",
+            "model": "plus_6",
+            "local_rules": "button 1 pressed -> relay 1 toggle",
+            "resync_interval": 60,
+        },
+        entry_id="soak",
+    )
+    await bridge.async_start()
+    assert bridge.connected
+
+    checkpoints = (max(cycles // 10, 1), cycles - 1)
+    samples = {}
+    tracemalloc.start()
+    try:
+        for cycle in range(cycles):
+            panel.drop_links()
+            await wait_connected(bridge)
+            await asyncio.sleep(2)
+
+            # Button storm, including rule executions
+            for press in range(50):
+                panel.send({"type": 0, "data": {"keyCode": 131, "action": press % 2, "repeatCount": 0}})
+            await asyncio.sleep(0.5)
+
+            assert await bridge.async_control_relay(2, cycle % 2 == 0)
+            assert await bridge.async_set_backlight(3, "white" if cycle % 2 else "off")
+            await bridge.async_apply_scene({1: True}, {4: "yellow" if cycle % 2 else "off"}, 0.5)
+
+            assert not bridge._state_waiters, f"scene waiters left after cycle {cycle}"
+            assert not bridge._pending, f"request waiters left after cycle {cycle}"
+
+            if cycle in checkpoints:
+                gc.collect()
+                samples[cycle] = (len(asyncio.all_tasks()), open_fds(), tracemalloc.get_traced_memory()[0])
+                print(f"cycle {cycle}: tasks={samples[cycle][0]} fds={samples[cycle][1]} memory={samples[cycle][2]}")
+
+        # A long outage must not end the reconnect attempts
+        await panel.stop()
+        await asyncio.sleep(3600)
+        assert not bridge.connected
+        await panel.start()
+        await wait_connected(bridge, 120)
+    finally:
+        tracemalloc.stop()
+        await bridge.async_stop()
+        await panel.stop()
+
+    (tasks_start, fds_start, memory_start), (tasks_end, fds_end, memory_end) = (
+        samples[checkpoints[0]],
+        samples[checkpoints[1]],
+    )
+    assert tasks_end <= tasks_start, f"task count grew from {tasks_start} to {tasks_end}"
+    assert fds_end <= fds_start, f"open fds grew from {fds_start} to {fds_end}"
+    assert memory_end - memory_start < MEMORY_GROWTH_LIMIT, f"traced memory grew by {memory_end - memory_start} bytes"
+    print(f"OK: {cycles} reconnect cycles, {loop.time() / 3600:.1f} virtual hours")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.CRITICAL)
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CYCLES
+    loop = VirtualLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(soak(cycles))
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()